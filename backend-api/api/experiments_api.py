@@ -6,8 +6,10 @@ Reads MLflow-compatible experiment/run/trace data from logs/experiments/.
 
 from fastapi import APIRouter, Query, HTTPException
 from pathlib import Path
+import asyncio
 import json
 
+from utils import langfuse_logger
 from utils.prompt_registry import get_prompt_registry
 from api.responses import _ok
 
@@ -25,6 +27,11 @@ SCORES_PATH = Path("logs/langfuse/scores")
 # Filesystem helpers (inlined from former ExperimentManager / RunManager)
 # ---------------------------------------------------------------------------
 
+async def _flush_langfuse():
+    """Let the langfuse background writer land queued files before reading logs/langfuse."""
+    await asyncio.to_thread(langfuse_logger.flush)
+
+
 def _read_yaml(file_path: Path) -> dict:
     """Read simple key: value YAML-like format."""
     data = {}
@@ -441,6 +448,7 @@ async def get_experiment_mappings(
 
 @router.get("/datasets")
 async def list_datasets():
+    await _flush_langfuse()
     datasets = []
     if DATASETS_PATH.exists():
         for d in DATASETS_PATH.iterdir():
@@ -455,6 +463,7 @@ async def get_dataset(
     limit: int = Query(100, le=500, ge=1),
     offset: int = Query(0, ge=0),
 ):
+    await _flush_langfuse()
     dataset_path = DATASETS_PATH / dataset_name
     if not dataset_path.exists():
         raise HTTPException(status_code=404, detail=f"Dataset '{dataset_name}' not found")
@@ -471,6 +480,7 @@ async def get_dataset(
 
 @router.get("/datasets/{dataset_name}/items/{item_id}")
 async def get_dataset_item(dataset_name: str, item_id: str):
+    await _flush_langfuse()
     dataset_path = DATASETS_PATH / dataset_name
     if not dataset_path.exists():
         raise HTTPException(status_code=404, detail=f"Dataset '{dataset_name}' not found")
@@ -487,6 +497,7 @@ async def get_dataset_item(dataset_name: str, item_id: str):
 
 @router.get("/datasets/{dataset_name}/items/{item_id}/full")
 async def get_dataset_item_full(dataset_name: str, item_id: str):
+    await _flush_langfuse()
     dataset_path = DATASETS_PATH / dataset_name
     if not dataset_path.exists():
         raise HTTPException(status_code=404, detail=f"Dataset '{dataset_name}' not found")
@@ -1,4 +1,5 @@
 """Pipeline configuration and trace lifecycle endpoints."""
+import asyncio
 import json
 import logging
 from pathlib import Path
@@ -109,7 +110,8 @@ async def create_pipeline_trace(req: TraceRequest):
     metadata = {"method": "pending"}
     if req.pipeline_version:
         metadata["pipeline_version"] = req.pipeline_version
-    trace_id = create_trace(
+    trace_id = await asyncio.to_thread(
+        create_trace,
         name="termnorm_pipeline",
         input={"query": req.query},
         user_id=req.user_id or "anonymous",
@@ -137,6 +139,12 @@ class StepReport(BaseModel):
 @router.post("/pipeline/steps")
 async def report_pipeline_step(report: StepReport):
     """Report a frontend pipeline step result as an observation on an existing trace."""
+    await asyncio.to_thread(_record_step, report)
+    return _ok(message="Step reported")
+
+
+def _record_step(report: StepReport):
+    """Write the step's observation and, for a final result, finalize the trace (blocking I/O)."""
     create_observation(
         trace_id=report.trace_id,
         type="span",
@@ -169,5 +177,3 @@ async def report_pipeline_step(report: StepReport):
             "confidence": report.result.get("confidence", 0),
             "latency_ms": report.latency_ms,
         })
-
-    return _ok(message="Step reported")
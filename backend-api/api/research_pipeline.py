@@ -26,6 +26,7 @@ from utils.langfuse_logger import (
 from utils.schema_registry import get_schema_registry
 from config.settings import settings
 from config.pipeline_config import (
+    get_batch_config,
     get_node_config,
     get_pipeline_steps,
     get_session_required_steps,
@@ -34,7 +35,7 @@ from config.pipeline_config import (
 
 logger = logging.getLogger(__name__)
 
-from api.responses import _ok
+from api.responses import _err, _ok
 from api._step_logging import STEP_NODE_TYPE, log_run_summary, log_step_short
 
 router = APIRouter()
@@ -57,6 +58,12 @@ _pipeline = get_pipeline_steps
 # Threshold for accepting fuzzy corrections in direct prompt
 ACCEPT_THRESHOLD = _node("direct_prompt")["accept_threshold"]
 
+# Batch /matches: cap the list and how many pipelines run at once, so a large
+# ``queries`` list can't start N LLM + Brave + scrape fan-outs simultaneously.
+_batch_cfg = get_batch_config()
+BATCH_MAX_QUERIES = _batch_cfg.get("max_queries", 50)
+BATCH_MAX_CONCURRENCY = _batch_cfg.get("max_concurrency", 4)
+
 
 def _update_session_usage(user_id, target=None):
     """Increment session query count and optionally track target usage."""
@@ -69,10 +76,35 @@ def _update_session_usage(user_id, target=None):
 
 
 # Session storage - stores terms array and usage stats per user
-# Structure: {user_id: {"terms": [...], "init_time": datetime, "query_count": int, "targets_used": {}}}
+# Structure: {user_id: {"terms": [...], "init_time": datetime, "query_count": int,
+#             "targets_used": {}, "token_matcher": asyncio.Future | None}}
 user_sessions = {}
 
 
+def _build_token_matcher(terms):
+    matcher = TokenLookupMatcher(terms)
+    logger.debug("%s token_matcher · unique=%d", TAG_REQ, len(matcher.deduplicated_terms))
+    return matcher
+
+
+def _session_token_matcher(user_id) -> asyncio.Future:
+    """Future for the session's token index, starting the build on first use.
+
+    The index depends only on the session's terms, which are fixed until the
+    next POST /sessions, so it is built once per session instead of once per
+    /matches request. The build runs in a worker thread: the first /matches
+    overlaps it with web research and entity profiling, and only the token
+    step awaits it. A failed build is retried by the next request.
+    """
+    session = user_sessions[user_id]
+    fut = session.get("token_matcher")
+    if fut is None or (fut.done() and (fut.cancelled() or fut.exception() is not None)):
+        fut = session["token_matcher"] = asyncio.ensure_future(
+            asyncio.to_thread(_build_token_matcher, session["terms"])
+        )
+    return fut
+
+
 @router.post("/sessions")
 async def init_terms(request: Request, payload: dict[str, Any] = Body(...)) -> dict[str, Any]:
     """Create session with terms array and tracking"""
@@ -90,7 +122,8 @@ async def init_terms(request: Request, payload: dict[str, Any] = Body(...)) -> d
         "terms": terms,
         "init_time": datetime.utcnow(),
         "query_count": 0,
-        "targets_used": {}  # target → count
+        "targets_used": {},  # target → count
+        "token_matcher": None,  # built lazily by the first /matches that needs it
     }
 
     logger.info(f"[SESSION] User {user_id}: Initialized session with {len(terms)} terms")
@@ -177,16 +210,25 @@ async def _run_research_step(query: str, steps: list[str], ws_cfg: dict, ep_cfg:
     return entity_profile, profile_debug, ep_time, ws_time
 
 
-def _run_token_step(query: str, entity_profile: list, token_matcher: "TokenLookupMatcher") -> tuple:
-    """Step 2: Token matching. Returns (candidate_results, elapsed_time)."""
+def _run_token_step(query: str, entity_profile: list, token_matcher: "TokenLookupMatcher", top_k: int | None = None) -> tuple:
+    """Step 2: Token matching. Returns (candidate_results, elapsed_time).
+
+    *top_k* caps the candidate pool (``candidate_pool_limit``); None keeps the
+    full ranked list.
+    """
     logger.info(YELLOW + "[PIPELINE] Step 2: Matching candidates" + RESET)
-    search_terms = [word for s in [query] + utils.flatten_strings(entity_profile) for word in s.split()]
-    unique_search_terms = list(set(search_terms))
+    profile_strings = [query] + utils.flatten_strings(entity_profile)
 
-    logger.debug(f"[PIPELINE] {len(unique_search_terms)} profile terms (from {len(search_terms)}): {', '.join(unique_search_terms[:20])}{'...' if len(unique_search_terms) > 20 else ''}")
+    # The word split + dedupe only feeds this debug line.
+    if logger.isEnabledFor(logging.DEBUG):
+        search_terms = [word for s in profile_strings for word in s.split()]
+        unique_search_terms = list(dict.fromkeys(search_terms))
+        logger.debug(f"[PIPELINE] {len(unique_search_terms)} profile terms (from {len(search_terms)}): {', '.join(unique_search_terms[:20])}{'...' if len(unique_search_terms) > 20 else ''}")
 
+    # The matcher tokenizes to a set itself, so it gets the profile text
+    # joined once — not the word list, whose repr() it would otherwise scan.
     t0 = time.time()
-    candidate_results = token_matcher.match(unique_search_terms)
+    candidate_results = token_matcher.match(" ".join(profile_strings), top_k=top_k)
     elapsed = round(time.time() - t0, 3)
 
     n = len(candidate_results)
@@ -404,7 +446,13 @@ async def _step_token(query: str, cfg: dict, ctx: PipelineContext) -> StepResult
         return StepResult(output=[], elapsed=0.0, status=StepStatus.SKIPPED)
 
     try:
-        results, elapsed = _run_token_step(query, entity_profile, token_matcher)
+        # Session index build started at request entry (see _session_token_matcher)
+        # Shielded: the build is shared by the session, so one cancelled
+        # request must not cancel it for every other request awaiting it.
+        token_matcher = await asyncio.shield(token_matcher)
+        results, elapsed = _run_token_step(
+            query, entity_profile, token_matcher, top_k=cfg.get("candidate_pool_limit"),
+        )
         return StepResult(output=results, elapsed=elapsed)
     except Exception as e:
         logger.error("[PIPELINE] Token matching failed: %s — continuing with empty candidates", e)
@@ -708,10 +756,69 @@ def _build_response(ctx: PipelineContext) -> tuple:
     return training_record, api_response
 
 
+# Keep [CFG] to values an operator actually tunes. Operational constants —
+# the UA pool, request headers, skip lists, retry policy, language/region —
+# are static noise that buried the meaningful knobs (models, limits, timeouts).
+_CFG_LOG_SKIP = frozenset({
+    "user_agents", "scrape_headers", "skip_extensions", "skip_domains",
+    "html_strip_tags", "keyword_split_chars", "scrape_retry_status_codes",
+    "accept_language", "search_language", "search_country", "spellcheck",
+    "result_filter", "extra_snippets", "freshness", "scrape_jitter",
+    "scrape_retry_delay", "scrape_max_retries", "title_truncate_length",
+    "min_keyword_length", "min_page_text_length", "max_page_text_length",
+    "fallback_keywords_limit", "schema_family", "schema_version",
+})
+
+
 @router.post("/matches")
 async def research_and_match(request: Request, payload: dict[str, Any] = Body(...)) -> dict[str, Any]:
-    """Normalize a term — dispatch through the step registry."""
+    """Normalize a term — dispatch through the step registry.
+
+    An optional ``queries`` list runs every query through the same pipeline
+    concurrently (an ``asyncio.gather`` fan-out, at most BATCH_MAX_CONCURRENCY
+    at a time), so the network-bound LLM and search calls overlap instead of
+    costing one round trip per request. A failing query yields an error entry
+    in ``results`` rather than failing the whole batch.
+    """
     user_id = request.state.user_id
+    queries = payload.get("queries")
+    if queries is None:
+        return await _match_one(user_id, payload)
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        raise HTTPException(status_code=400, detail="queries must be a list of strings")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"queries has {len(queries)} items - at most {BATCH_MAX_QUERIES} per batch",
+        )
+
+    # trace_id names a single trace, so batch items each get their own.
+    base = {k: v for k, v in payload.items() if k not in ("queries", "trace_id")}
+    limit = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def match_limited(q):
+        async with limit:
+            return await _match_one(user_id, {**base, "query": q})
+
+    outcomes = await asyncio.gather(*(match_limited(q) for q in queries), return_exceptions=True)
+    results = [_batch_item_error(q, o) if isinstance(o, BaseException) else o for q, o in zip(queries, outcomes)]
+    failed = sum(r.get("status") == "error" for r in results)
+    return _ok(
+        message=f"Batch completed - {len(results)} queries, {failed} failed",
+        data={"results": results},
+    )
+
+
+def _batch_item_error(query: str, exc: BaseException) -> dict[str, Any]:
+    """Shape one failed batch item like an error response."""
+    if isinstance(exc, HTTPException):
+        return _err(f"Query failed: {query}", data={"status_code": exc.status_code, "detail": exc.detail})
+    logger.error("[BATCH] Query %r failed: %r", query, exc, exc_info=exc)
+    return _err(f"Query failed: {query}", data={"status_code": 500, "detail": str(exc) or type(exc).__name__})
+
+
+async def _match_one(user_id, payload: dict[str, Any]) -> dict[str, Any]:
+    """Run one query through the step registry and return its response."""
     query = payload.get("query", "")
     payload_steps = payload.get("steps")
     steps = payload_steps or _pipeline("default")
@@ -767,25 +874,13 @@ async def research_and_match(request: Request, payload: dict[str, Any] = Body(..
     # line instead of digging through optimizer state. Only the keys actually
     # overridden are printed; backend defaults stay implicit.
     caller_ov = payload.get("node_config") or {}
-    # Keep [CFG] to values an operator actually tunes. Operational constants —
-    # the UA pool, request headers, skip lists, retry policy, language/region —
-    # are static noise that buried the meaningful knobs (models, limits, timeouts).
-    _cfg_skip = {
-        "user_agents", "scrape_headers", "skip_extensions", "skip_domains",
-        "html_strip_tags", "keyword_split_chars", "scrape_retry_status_codes",
-        "accept_language", "search_language", "search_country", "spellcheck",
-        "result_filter", "extra_snippets", "freshness", "scrape_jitter",
-        "scrape_retry_delay", "scrape_max_retries", "title_truncate_length",
-        "min_keyword_length", "min_page_text_length", "max_page_text_length",
-        "fallback_keywords_limit", "schema_family", "schema_version",
-    }
     for node_name, ov_keys in caller_ov.items():
         if not isinstance(ov_keys, dict) or not ov_keys:
             continue
         ov_fields = [
             (k, v)
             for k, v in ov_keys.items()
-            if k not in _cfg_skip
+            if k not in _CFG_LOG_SKIP
             and not isinstance(v, (list, dict))
             and v not in (None, "")
         ]
@@ -807,12 +902,7 @@ async def research_and_match(request: Request, payload: dict[str, Any] = Body(..
     # Seed session data into context — only when pipeline needs term matching
     if requires_session and terms:
         ctx.set_output("_session_terms", terms)
-        token_matcher = TokenLookupMatcher(terms)
-        ctx.set_output("_token_matcher", token_matcher)
-        logger.debug(
-            "%s token_matcher · unique=%d",
-            TAG_REQ, len(token_matcher.deduplicated_terms),
-        )
+        ctx.set_output("_token_matcher", _session_token_matcher(user_id))
 
     # Pre-register precomputed outputs (per-node deserializers in PRECOMPUTED_DESERIALIZERS)
     for step_name, precomp_data in precomputed.items():
@@ -913,7 +1003,8 @@ async def batch_start(
     if item_count < 1:
         raise HTTPException(400, "item_count must be >= 1")
 
-    batch_id = log_batch_start(
+    batch_id = await asyncio.to_thread(
+        log_batch_start,
         method=method,
         user_prompt=user_prompt,
         item_count=item_count,
@@ -948,7 +1039,8 @@ async def batch_complete(
     error_count = payload.get("error_count", 0)
     total_time_ms = payload.get("total_time_ms", 0)
 
-    log_batch_complete(
+    await asyncio.to_thread(
+        log_batch_complete,
         batch_id=batch_id,
         success_count=success_count,
         error_count=error_count,
@@ -1099,12 +1191,14 @@ Return ONLY valid JSON."""
     }
 
     try:
-        log_pipeline(training_record, session_id=user_id, batch_id=batch_id, user_prompt=user_prompt)
+        await asyncio.to_thread(
+            log_pipeline, training_record, session_id=user_id, batch_id=batch_id, user_prompt=user_prompt
+        )
     except Exception as e:
         logger.error(f"[LANGFUSE] Failed to log: {e}")
 
     if not needs_user_selection:
-        update_match_database(training_record)
+        await asyncio.to_thread(update_match_database, training_record)
     _update_session_usage(user_id, target if not needs_user_selection else None)
 
     logger.info(f"[DIRECT_PROMPT] {query[:30]}... -> {target[:30]} ({confidence:.0%}) in {total_time}s")
@@ -1160,7 +1254,8 @@ async def log_match(request: Request, payload: LogMatchRequest) -> dict[str, Any
 
     try:
         if payload.method == "cached":
-            trace_id = log_cache_match(
+            trace_id = await asyncio.to_thread(
+                log_cache_match,
                 source=payload.source,
                 target=payload.target,
                 latency_ms=payload.latency_ms or 0,
@@ -1168,7 +1263,8 @@ async def log_match(request: Request, payload: LogMatchRequest) -> dict[str, Any
                 session_id=user_id,
             )
         elif payload.method == "fuzzy":
-            trace_id = log_fuzzy_match(
+            trace_id = await asyncio.to_thread(
+                log_fuzzy_match,
                 source=payload.source,
                 target=payload.target,
                 confidence=payload.confidence,
@@ -1202,7 +1298,8 @@ async def log_activity(request: Request, payload: LogActivityRequest) -> dict[st
     Updates ground truth in dataset item.
     """
     try:
-        success = log_user_correction(
+        success = await asyncio.to_thread(
+            log_user_correction,
             source=payload.source,
             target=payload.target,
             method=payload.method,
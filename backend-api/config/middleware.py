@@ -59,7 +59,7 @@ async def user_auth_middleware(request: Request, call_next):
 
         # Inject user context into request
         request.state.user_id = user_id
-        logger.debug(f"[USER_AUTH] Request from user {user_id} (IP: {client_ip})")
+        logger.debug("[USER_AUTH] Request from user %s (IP: %s)", user_id, client_ip)
 
     response = await call_next(request)
     return response
@@ -31,6 +31,11 @@ def get_llm_defaults():
     return _config.get("llm_defaults", {})
 
 
+def get_batch_config():
+    """Return batch section (limits for the /matches ``queries`` fan-out)."""
+    return _config.get("batch", {})
+
+
 def get_session_required_steps() -> set[str]:
     """Return node names that require an active session (terms index)."""
     return {
@@ -7,10 +7,12 @@ node's ``config.provider`` (overridable per request via ``node_config``).
 """
 
 import asyncio
+import copy
 import json
 import logging
 import os
 import re
+from collections import OrderedDict
 from collections.abc import Callable, Iterator
 from dataclasses import dataclass
 from typing import Literal
@@ -24,7 +26,7 @@ from core.log_format import (
     continuation,
     fmt_fields,
 )
-from utils.utils import RED, RESET
+from utils.utils import RED, RESET, json_loads
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +57,10 @@ _STRUCTURED_OUTPUT_MODE = _llm_cfg.get("structured_output_mode", "native")
 # accept much higher). Override via ``llm_defaults.anthropic_max_tokens_default``
 # in pipeline.json if you need more headroom on a specific deployment.
 _ANTHROPIC_MAX_TOKENS_DEFAULT = _llm_cfg.get("anthropic_max_tokens_default", 8192)
+# Deterministic (temperature 0) completions are memoized per process so a
+# repeated source value — duplicated Excel cells, PromptPotter re-scoring the
+# same item — skips the network round trip. 0 disables the cache.
+_RESPONSE_CACHE_SIZE = _llm_cfg.get("response_cache_size", 256)
 
 
 @dataclass(frozen=True)
@@ -78,6 +84,16 @@ _OPENAI_COMPAT_SPECS: dict[str, ProviderSpec] = {
 
 _VALID_PROVIDERS = sorted(set(_OPENAI_COMPAT_SPECS) | {"anthropic"})
 
+# Provider finish/stop reasons normalized to one vocabulary for PromptPotter's
+# classifier; unmapped values pass through unchanged.
+_ANTH_FINISH_MAP = {
+    "end_turn": "stop",
+    "stop_sequence": "stop",
+    "max_tokens": "length",
+    "tool_use": "tool_use",
+}
+_OAI_FINISH_MAP = {"tool_calls": "tool_use"}
+
 
 def get_available_providers() -> list[str]:
     """Return list of providers with configured API keys."""
@@ -263,6 +279,10 @@ def _extract_error_code(e: Exception) -> str | None:
     return None
 
 
+# Groq's rate-limit body hint: "try again in 1m2.5s" / "try again in 7.2s".
+_RETRY_IN_RE = re.compile(r"try again in (?:(\d+)m)?\s*(\d+(?:\.\d+)?)\s*s")
+
+
 def _extract_retry_after(exc: Exception) -> int | None:
     """Pull Retry-After (seconds) from a Groq/OpenAI SDK rate-limit exception.
 
@@ -280,12 +300,71 @@ def _extract_retry_after(exc: Exception) -> int | None:
                 return int(float(val))
             except (TypeError, ValueError):
                 pass
-    m = re.search(r"try again in (?:(\d+)m)?\s*(\d+(?:\.\d+)?)\s*s", str(exc))
+    m = _RETRY_IN_RE.search(str(exc))
     if m:
         return int(int(m.group(1) or 0) * 60 + float(m.group(2)))
     return None
 
 
+_response_cache: OrderedDict[str, tuple[str | dict, str]] = OrderedDict()
+
+
+def _response_cache_key(provider: str, params: dict, output_format: str, schema: dict | None) -> str | None:
+    """Cache key for a deterministic call, or None when the call must not be cached."""
+    if (
+        not _RESPONSE_CACHE_SIZE
+        or params["temperature"] != 0
+        or "tools" in params
+        or "logprobs" in params
+    ):
+        return None
+    return json.dumps([provider, params, output_format, schema], sort_keys=True, default=str)
+
+
+def _cache_response(key: str, result: str | dict, finish_reason: str) -> None:
+    _response_cache[key] = (copy.deepcopy(result), finish_reason)
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > _RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+
+# Provider clients, reused across calls so concurrent requests share one
+# keep-alive connection pool instead of paying a TCP/TLS handshake per call.
+# Keyed by (provider, api_key); each entry remembers the event loop it was
+# built on, because the underlying httpx pool cannot cross loops.
+_CLIENTS: dict[tuple[str, str], tuple[asyncio.AbstractEventLoop, object]] = {}
+
+
+def _provider_client(provider: str):
+    """Return the shared async client for ``provider`` on the running loop."""
+    if provider in _OPENAI_COMPAT_SPECS:
+        api_key = os.getenv(_OPENAI_COMPAT_SPECS[provider].api_key_env)
+    else:  # anthropic
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError(f"API key not found for {provider}")
+
+    loop = asyncio.get_running_loop()
+    cached = _CLIENTS.get((provider, api_key))
+    if cached is not None and cached[0] is loop:
+        return cached[1]
+
+    if provider in _OPENAI_COMPAT_SPECS:
+        spec = _OPENAI_COMPAT_SPECS[provider]
+        from openai import AsyncOpenAI
+
+        client_kwargs: dict = {"api_key": api_key}
+        if spec.base_url:
+            client_kwargs["base_url"] = spec.base_url
+        client = AsyncOpenAI(**client_kwargs)
+    else:
+        import anthropic
+
+        client = anthropic.AsyncAnthropic(api_key=api_key)
+    _CLIENTS[(provider, api_key)] = (loop, client)
+    return client
+
+
 async def llm_call(
     messages: list[dict[str, str]],
     *,
@@ -393,24 +472,22 @@ async def llm_call(
         else:
             params["response_format"] = {"type": "json_object"}
 
-    # Construct provider client
-    if is_openai_compat:
-        spec = _OPENAI_COMPAT_SPECS[provider]
-        from openai import AsyncOpenAI
-
-        api_key = os.getenv(spec.api_key_env)
-        client_kwargs: dict = {"api_key": api_key}
-        if spec.base_url:
-            client_kwargs["base_url"] = spec.base_url
-        client = AsyncOpenAI(**client_kwargs)
-    else:  # anthropic
-        import anthropic
-
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        client = anthropic.AsyncAnthropic(api_key=api_key)
-
-    if not api_key:
-        raise ValueError(f"API key not found for {provider}")
+    cache_key = _response_cache_key(provider, params, output_format, schema)
+    if cache_key is not None and cache_key in _response_cache:
+        _response_cache.move_to_end(cache_key)
+        result, cached_fr = _response_cache[cache_key]
+        if usage_out is not None:
+            usage_out.update(
+                input=0,
+                output=0,
+                finish_reason=cached_fr,
+                max_tokens_requested=params.get("max_tokens", max_tokens),
+                model=model,
+            )
+        logger.debug("%s %s · response cache hit", TAG_LLM, node_name or "llm")
+        return copy.deepcopy(result)
+
+    client = _provider_client(provider)
 
     # Retry logic with exponential backoff. ``attempt`` advances only on transport
     # errors (timeout / 5xx); schema-repair re-issues use ``repair_attempt`` and a
@@ -487,18 +564,11 @@ async def llm_call(
             # across providers so PromptPotter's classifier sees stable values.
             if provider == "anthropic":
                 _raw_fr = getattr(response, "stop_reason", None)
-                _ANTH_MAP = {
-                    "end_turn": "stop",
-                    "stop_sequence": "stop",
-                    "max_tokens": "length",
-                    "tool_use": "tool_use",
-                }
-                normalized_fr = _ANTH_MAP.get(_raw_fr or "", _raw_fr or "unknown")
+                normalized_fr = _ANTH_FINISH_MAP.get(_raw_fr or "", _raw_fr or "unknown")
                 truncated = _raw_fr == "max_tokens"
             else:
                 _raw_fr = response.choices[0].finish_reason if response.choices else None
-                _OAI_MAP = {"tool_calls": "tool_use"}
-                normalized_fr = _OAI_MAP.get(_raw_fr or "", _raw_fr or "unknown")
+                normalized_fr = _OAI_FINISH_MAP.get(_raw_fr or "", _raw_fr or "unknown")
                 truncated = _raw_fr == "length"
 
             if truncated and output_format in ("json", "schema") and max_tokens is not None:
@@ -556,7 +626,7 @@ async def llm_call(
             # response_format is involved, so this is the only JSON-correctness gate.
             if output_format in ("json", "schema"):
                 try:
-                    parsed = json.loads(content)
+                    parsed = json_loads(content)
                 except json.JSONDecodeError:
                     if repair_attempt < _STRUCTURED_REPAIR_ATTEMPTS:
                         repair_attempt += 1
@@ -589,7 +659,11 @@ async def llm_call(
                             "node": node_name,
                         },
                     )
+                if cache_key is not None and not repair_attempt:
+                    _cache_response(cache_key, parsed, normalized_fr)
                 return parsed
+            if cache_key is not None and not truncated:
+                _cache_response(cache_key, content, normalized_fr)
             return content
 
         except HTTPException:
@@ -13,6 +13,28 @@ _LR_CONFIG = get_node_config("llm_ranking")
 
 from utils.utils import GREEN, YELLOW, BRIGHT_RED, RESET
 
+# Output-shape reminder appended to every ranking prompt. Constant, so it is
+# built once here rather than re-formatted into an f-string per request.
+_RANKING_FORMAT_SUFFIX = """
+
+IMPORTANT: Return a valid JSON response matching this exact structure:
+{
+  "profile_summary": "Brief 1-2 sentence summary of the profile",
+  "core_concept_description": "What the core concept fundamentally is",
+  "ranked_candidates": [
+    {
+      "candidate": "exact candidate string",
+      "core_concept_score": 0.0,
+      "spec_score": 0.0,
+      "evaluation_reasoning": "Brief explanation without quotes or backslashes",
+      "key_match_factors": ["factor1", "factor2"],
+      "spec_gaps": ["gap1", "gap2"]
+    }
+  ]
+}
+
+Ensure all strings are properly escaped and avoid complex punctuation in reasoning."""
+
 
 def find_top_matches(llm_string: str, candidates: list[str], n: int) -> list[tuple[str, float]]:
     """Find top N matching candidates using rapidfuzz ratio."""
@@ -107,25 +129,7 @@ async def call_llm_for_ranking(
             matches=matches
         )
 
-    enhanced_prompt = f"""{prompt}
-
-IMPORTANT: Return a valid JSON response matching this exact structure:
-{{
-  "profile_summary": "Brief 1-2 sentence summary of the profile",
-  "core_concept_description": "What the core concept fundamentally is",
-  "ranked_candidates": [
-    {{
-      "candidate": "exact candidate string",
-      "core_concept_score": 0.0,
-      "spec_score": 0.0,
-      "evaluation_reasoning": "Brief explanation without quotes or backslashes",
-      "key_match_factors": ["factor1", "factor2"],
-      "spec_gaps": ["gap1", "gap2"]
-    }}
-  ]
-}}
-
-Ensure all strings are properly escaped and avoid complex punctuation in reasoning."""
+    enhanced_prompt = prompt + _RANKING_FORMAT_SUFFIX
 
     ranking_schema = lr_cfg.get("output_schema")
     llm_kwargs = {
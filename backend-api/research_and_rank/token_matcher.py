@@ -1,38 +1,58 @@
 """Token-based matcher for candidate filtering using inverted index lookup."""
+import heapq
 import re
-from collections import defaultdict
+from collections import Counter, defaultdict
+from operator import itemgetter
 
 from config.pipeline_config import get_node_config
 
 _TM_CONFIG = get_node_config("token_matching")
+_TOKEN_FINDALL = re.compile(_TM_CONFIG["tokenization_regex"]).findall
 
 
 class TokenLookupMatcher:
     """Token-based matcher that builds an inverted index for fast candidate lookup."""
 
     def __init__(self, terms: list[str]):
-        self.deduplicated_terms = list(set(terms))
+        # dict.fromkeys dedupes in one pass like set() but keeps first-seen
+        # order, so term ids follow the caller's list instead of the
+        # per-process string hash seed.
+        self.deduplicated_terms = list(dict.fromkeys(terms))
         self.token_term_lookup = self._build_index()
 
     def _tokenize(self, text):
-        return set(re.findall(_TM_CONFIG["tokenization_regex"], str(text).lower()))
+        return frozenset(_TOKEN_FINDALL(str(text).lower()))
 
     def _build_index(self):
-        index = defaultdict(set)
+        # Terms are visited in index order and _tokenize yields each token once
+        # per term, so appending keeps every posting sorted and duplicate-free
+        # without a set per token. Frozen to tuples: a fraction of a set's memory,
+        # and the fastest thing for match() to iterate.
+        index = defaultdict(list)
         for i, term in enumerate(self.deduplicated_terms):
             for token in self._tokenize(term):
-                index[token].add(i)
-        return index
+                index[token].append(i)
+        return {token: tuple(posting) for token, posting in index.items()}
 
-    def match(self, query) -> list[tuple[str, float]]:
+    def match(self, query, top_k: int | None = None) -> list[tuple[str, float]]:
+        """Score every term sharing a token with *query*, best first.
+
+        With *top_k*, only the best ``top_k`` are returned, selected with a
+        bounded heap instead of sorting the whole candidate set.
+        """
         query_tokens = self._tokenize(query)
         if not query_tokens:
             return []
 
-        # Find candidates
-        candidates = set()
+        # Shared-token count per candidate, straight from the postings: a term
+        # appears once in the posting of every query token it contains, so its
+        # count is |query ∩ term|. Counter.update tallies in C — no per-candidate
+        # set intersection, and only terms sharing a token are ever touched.
+        shared = Counter()
         for token in query_tokens:
-            candidates.update(self.token_term_lookup.get(token, set()))
+            posting = self.token_term_lookup.get(token)
+            if posting:
+                shared.update(posting)
 
         # Score candidates by how much of the query they cover. Normalizing by
         # the query (constant across candidates) — not the candidate's own length
@@ -40,12 +60,14 @@ class TokenLookupMatcher:
         # market for steel") from losing to a short generic one ("unalloyed
         # steel") at equal overlap. This is recall: surface the right label into
         # the top-K; the LLM ranker downstream decides precision.
-        scores = []
-        for i in candidates:
-            term_tokens = self._tokenize(self.deduplicated_terms[i])
-            shared_token_count = len(query_tokens & term_tokens)
-            if shared_token_count > 0:
-                score = shared_token_count / len(query_tokens)
-                scores.append((self.deduplicated_terms[i], score))
-
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+        # Rank on the integer counts (most_common: a stable C-keyed sort, same
+        # order as sorting the ratios) and only then divide, so the sort never
+        # compares floats or calls a Python key function. nlargest keeps the
+        # same stable order for the cut.
+        if top_k is not None and top_k < len(shared):
+            ranked = heapq.nlargest(top_k, shared.items(), key=itemgetter(1))
+        else:
+            ranked = shared.most_common()
+        n_query = len(query_tokens)
+        terms = self.deduplicated_terms
+        return [(terms[i], count / n_query) for i, count in ranked]
@@ -1,15 +1,23 @@
 import asyncio
+import codecs
+import functools
+import http.cookiejar
 import io
+import json
 import time
 import random
 import logging
 import re
+import threading
 import requests
-from bs4 import BeautifulSoup
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit, urlunsplit
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
 from concurrent.futures import ThreadPoolExecutor
 from core.llm_providers import llm_call
 from core.pipeline_context import StepWarning, WarningKind, http_status_warning
-from utils.utils import GREEN, YELLOW, BRIGHT_RED, RESET
+from utils.utils import GREEN, YELLOW, BRIGHT_RED, RESET, json_loads
 from config.settings import settings
 from config.pipeline_config import get_node_config
 from utils.prompt_registry import get_prompt_registry
@@ -31,6 +39,12 @@ SEARCH_LANGUAGE = _WS_CONFIG["search_language"]
 SEARCH_COUNTRY = _WS_CONFIG["search_country"]
 ACCEPT_LANGUAGE = _WS_CONFIG["accept_language"]
 HTML_STRIP_TAGS = _WS_CONFIG["html_strip_tags"]
+# Optional parse whitelist: only these tags' subtrees (plus <title>) are built
+# into the soup — a much smaller tree, and chrome outside them is never parsed.
+# Empty = full parse. Off by default: text in bare <div>s outside the listed
+# tags is dropped, so sweep it on ground truth before enabling.
+HTML_PARSE_ONLY_TAGS = _WS_CONFIG.get("html_parse_only_tags", [])
+_PARSE_ONLY = SoupStrainer(["title", *HTML_PARSE_ONLY_TAGS]) if HTML_PARSE_ONLY_TAGS else None
 MIN_KEYWORD_LENGTH = _WS_CONFIG["min_keyword_length"]
 KEYWORD_SPLIT_CHARS = _WS_CONFIG["keyword_split_chars"]
 SCRAPE_MAX_RETRIES = _WS_CONFIG.get("scrape_max_retries", 1)
@@ -38,6 +52,16 @@ SCRAPE_RETRY_DELAY = _WS_CONFIG.get("scrape_retry_delay", 1.0)
 SCRAPE_RETRY_STATUS_CODES = set(_WS_CONFIG.get("scrape_retry_status_codes", [429, 500, 502, 503, 504]))
 SCRAPE_JITTER = _WS_CONFIG.get("scrape_jitter", 0.5)
 SCRAPE_EXTRA_HEADERS = _WS_CONFIG.get("scrape_headers", {})
+SCRAPE_READ_CHUNK = 16384
+# In-process result caches (0 TTL disables). Spreadsheets repeat entities, and
+# a repeat match otherwise re-spends a metered Brave query and re-scrapes the
+# same pages. Only successes are cached — a 429 or timeout is retried next time.
+SEARCH_CACHE_TTL = _WS_CONFIG.get("search_cache_ttl", 3600)
+SEARCH_CACHE_SIZE = _WS_CONFIG.get("search_cache_size", 256)
+SCRAPE_CACHE_SIZE = _WS_CONFIG.get("scrape_cache_size", 1024)
+# Minimum spacing between Brave queries from this process (free tier: 1/sec).
+# Concurrent matches await their slot instead of tripping a 429; 0 disables.
+BRAVE_MIN_INTERVAL = _WS_CONFIG.get("brave_min_interval", 1.0)
 # PDF datasheets (matweb/basf/sabic) hold the truest materials data but were
 # blanket-skipped. When extract_pdf is on we pull their text too. PDFs need a
 # bigger byte budget than HTML (the xref table lives at the end — a too-tight
@@ -46,9 +70,156 @@ SCRAPE_EXTRA_HEADERS = _WS_CONFIG.get("scrape_headers", {})
 PDF_MAX_PAGES = _WS_CONFIG.get("pdf_max_pages", 10)
 PDF_MAX_BYTES = _WS_CONFIG.get("pdf_max_bytes", 5_000_000)
 
+# lxml is the C-backed tree builder — several times faster than html.parser on
+# the ~50 KB pages we parse per scrape. When installed, _extract_html uses it
+# directly (no soup layer); otherwise BeautifulSoup on the stdlib parser.
+try:
+    from lxml import html as _lxml_html
+    _HTML_PARSER = "lxml"
+except ImportError:
+    _lxml_html = None
+    _HTML_PARSER = "html.parser"
+_STRIP_XPATH = "|".join(f"//{tag}" for tag in HTML_STRIP_TAGS)
+_CHARSET_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
 _USER_AGENTS = _WS_CONFIG.get("user_agents", [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36',
 ])
+# One complete header set per UA, built once — scrape_url picks one instead of
+# assembling a dict per URL. requests copies them on send, never mutates.
+_SCRAPE_HEADER_SETS = tuple(
+    {'User-Agent': ua, 'Accept-Language': ACCEPT_LANGUAGE, **SCRAPE_EXTRA_HEADERS}
+    for ua in _USER_AGENTS
+)
+_PROMPT_VAR_RE = re.compile(r"\{\{(\w+)\}\}")
+
+
+# One pooled session for Brave + every scrape: keep-alive reuses the TCP/TLS
+# connection on repeat hosts (Brave on every match) instead of a fresh handshake
+# per GET. Pool sized to the scrape fan-out; urllib3-level retries stay off —
+# scrape_url owns its retry policy (status codes, delay, deadline). Only the
+# pooling is shared: cookies are never stored, so scraped sites can't grow the
+# jar or get their cookies sent back on a later visit (plain requests.get kept none).
+_HTTP = requests.Session()
+_HTTP.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=16, pool_maxsize=max(16, SCRAPE_MAX_WORKERS), max_retries=0
+)
+_HTTP.mount("http://", _HTTP_ADAPTER)
+_HTTP.mount("https://", _HTTP_ADAPTER)
+
+
+class _TTLCache:
+    """Bounded LRU with a per-entry expiry. Thread-safe: scrape workers share it."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_search_cache = _TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+_scrape_cache = _TTLCache(SCRAPE_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+
+_brave_next_slot = 0.0
+_brave_slot_lock = threading.Lock()
+
+
+def _reserve_brave_slot():
+    """Reserve the next Brave send time; returns seconds to wait for it (0 when
+    the last query was long enough ago). Never blocks — callers ``await`` the wait."""
+    global _brave_next_slot
+    with _brave_slot_lock:
+        now = time.monotonic()
+        slot = max(now, _brave_next_slot)
+        _brave_next_slot = slot + BRAVE_MIN_INTERVAL
+    return slot - now
+
+
+def _compile_skip_re(needles):
+    """One case-insensitive alternation over the configured substrings, so a URL
+    is checked in a single C-level scan instead of a lowered copy + an ``any()``
+    per list. ``None`` when the list is empty — an empty alternation would match
+    every URL."""
+    if not needles:
+        return None
+    return re.compile("|".join(map(re.escape, needles)), re.IGNORECASE)
+
+
+_SKIP_EXTENSIONS_RE = _compile_skip_re(SKIP_EXTENSIONS)
+_SKIP_DOMAINS_RE = _compile_skip_re(SKIP_DOMAINS)
+_TRACKING_PARAM_RE = re.compile(r'^(utm_\w+|gclid|fbclid|msclkid|mc_eid)$', re.IGNORECASE)
+
+
+def _skip_reason(url):
+    """The ``_filtered`` reason for a URL we never fetch, or ``None``."""
+    if _SKIP_EXTENSIONS_RE is not None and _SKIP_EXTENSIONS_RE.search(url):
+        return "skip_extension"
+    if _SKIP_DOMAINS_RE is not None and _SKIP_DOMAINS_RE.search(url):
+        return "skip_domain"
+    return None
+
+
+def _canonical_url(url):
+    """Cache identity of a page: lowercase scheme/host, no fragment, no
+    tracking parameters (utm_*, gclid, …) — variants of one page share an entry."""
+    p = urlsplit(url)
+    query = "&".join(
+        kv for kv in p.query.split("&")
+        if kv and not _TRACKING_PARAM_RE.match(kv.split("=", 1)[0])
+    )
+    return urlunsplit((p.scheme.lower(), p.netloc.lower(), p.path, query, ""))
+
+# Last scrape start per host (monotonic). The jitter sleep is politeness toward
+# one host — Brave results are mostly distinct hosts, so only a repeat hit inside
+# the jitter window waits; every other scrape starts immediately.
+_host_last_hit: dict[str, float] = {}
+_host_last_hit_lock = threading.Lock()
+_HOST_LAST_HIT_MAX = 1024
+
+
+def _host_jitter_delay(url):
+    """Seconds to wait before fetching *url*: a random jitter when the same host
+    was hit less than ``SCRAPE_JITTER`` seconds ago, else 0."""
+    host = urlsplit(url).netloc.lower()
+    now = time.monotonic()
+    with _host_last_hit_lock:
+        last = _host_last_hit.get(host)
+        if len(_host_last_hit) >= _HOST_LAST_HIT_MAX:
+            _host_last_hit.clear()
+        _host_last_hit[host] = now
+    if last is None or now - last >= SCRAPE_JITTER:
+        return 0.0
+    return random.uniform(0, SCRAPE_JITTER)
 
 
 def _split_keywords(query):
@@ -63,9 +234,15 @@ def _generate_format_string_from_schema(schema):
     """Generate the JSON format string for LLM prompt from a JSON schema"""
     if 'properties' not in schema:
         raise ValueError("Schema must contain 'properties' field")
+    # Schemas are fixed per project, so the rendered string is cached by content
+    # (key keeps property order — it is the field order the LLM sees).
+    return _format_string_cached(json.dumps(schema['properties']))
+
 
+@functools.lru_cache(maxsize=32)
+def _format_string_cached(properties_key):
     format_items = []
-    for prop_name, prop_def in schema['properties'].items():
+    for prop_name, prop_def in json.loads(properties_key).items():
         prop_type = prop_def.get('type', 'string')
 
         if prop_type == 'string':
@@ -93,37 +270,84 @@ def _extract_pdf_text(data):
         from pypdf import PdfReader
         reader = PdfReader(io.BytesIO(data))
         parts = [(page.extract_text() or "") for page in reader.pages[:PDF_MAX_PAGES]]
-        return re.sub(r'\s+', ' ', " ".join(parts).strip())
+        return " ".join(" ".join(parts).split())
     except Exception as e:
         logger.debug("PDF extract failed: %s", e)
         return ""
 
 
+def _declared_length(response):
+    """The response's Content-Length, or 0 when absent/malformed (e.g. chunked)."""
+    try:
+        return int(response.headers.get("Content-Length") or 0)
+    except ValueError:
+        return 0
+
+
+def _extract_html(data, charset=None):
+    """``(title, text)`` of an HTML page: ``html_strip_tags`` removed, whitespace
+    collapsed; ``title`` is ``None`` when the page has none. With lxml (and no
+    ``html_parse_only_tags`` whitelist) the tree build, tag drop and text walk
+    all stay in C; BeautifulSoup otherwise."""
+    if _lxml_html is not None and _PARSE_ONLY is None:
+        if not data.strip():
+            return None, ""
+        if charset:
+            try:
+                codecs.lookup(charset)
+            except LookupError:
+                charset = None
+        if not charset:
+            # libxml2 assumes latin-1 when the header is silent; sniff like bs4
+            # would (BOM, <meta charset>, utf-8, windows-1252) instead.
+            charset = UnicodeDammit(data, is_html=True).original_encoding
+        parser = _lxml_html.HTMLParser(encoding=charset) if charset else None
+        try:
+            tree = _lxml_html.document_fromstring(data, parser=parser)
+        except Exception:  # lxml.etree.ParserError — empty/unparseable document
+            return None, ""
+        if _STRIP_XPATH:
+            for el in tree.xpath(_STRIP_XPATH):
+                el.drop_tree()
+        return tree.findtext('.//title'), " ".join(tree.text_content().split())
+
+    # A declared charset skips bs4's encoding sniff over the whole buffer.
+    soup = BeautifulSoup(data, _HTML_PARSER, from_encoding=charset, parse_only=_PARSE_ONLY)
+    for tag in soup(HTML_STRIP_TAGS):
+        tag.decompose()
+    title = soup.find('title')
+    # A strained tree loses the whitespace between kept elements, so join
+    # their strings with a space or adjacent blocks fuse words.
+    text = " ".join(soup.get_text(' ' if _PARSE_ONLY else '').split())
+    return (title.get_text() if title else None), text
+
+
 def scrape_url(url, char_limit, extract_pdf=False):
     """Scrape one URL to {title, content, url}, or a typed rejection dict
     ({"_filtered": reason} / {"_scrape_error": ...}). Never raises. Used only by
     the ``scrape`` / ``hybrid`` strategies — the per-URL bounds here are the byte
     cap and a per-read wall-clock deadline; the *aggregate* batch bound lives in
     ``_from_scrape`` (asyncio.wait_for) so a slow batch can never hang the step."""
-    url_lower = url.lower()
-    if any(ext in url_lower for ext in SKIP_EXTENSIONS):
-        return {"_filtered": "skip_extension", "url": url}
-    if any(domain in url_lower for domain in SKIP_DOMAINS):
-        return {"_filtered": "skip_domain", "url": url}
+    reason = _skip_reason(url)
+    if reason:
+        return {"_filtered": reason, "url": url}
+
+    cache_key = (_canonical_url(url), char_limit, extract_pdf)
+    cached = _scrape_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
 
     try:
         if SCRAPE_JITTER > 0:
-            time.sleep(random.uniform(0, SCRAPE_JITTER))
+            delay = _host_jitter_delay(url)
+            if delay:
+                time.sleep(delay)
 
-        headers = {
-            'User-Agent': random.choice(_USER_AGENTS),
-            'Accept-Language': ACCEPT_LANGUAGE,
-            **SCRAPE_EXTRA_HEADERS,
-        }
+        headers = random.choice(_SCRAPE_HEADER_SETS)
 
         response = None
         for attempt in range(1 + SCRAPE_MAX_RETRIES):
-            response = requests.get(
+            response = _HTTP.get(
                 url, timeout=SCRAPE_TIMEOUT_SECONDS, headers=headers, stream=True
             )
             if response.status_code in SCRAPE_RETRY_STATUS_CODES and attempt < SCRAPE_MAX_RETRIES:
@@ -137,8 +361,9 @@ def scrape_url(url, char_limit, extract_pdf=False):
             return {"_filtered": f"http_{response.status_code}", "url": url}
 
         content_type = response.headers.get("Content-Type", "").lower()
-        is_pdf = "pdf" in content_type or url_lower.endswith(".pdf")
-        is_html = "html" in content_type or "text" in content_type
+        is_pdf = "pdf" in content_type or url.lower().endswith(".pdf")
+        # html/xhtml or plain text — not text/css, text/javascript, text/csv.
+        is_html = "html" in content_type or content_type.startswith("text/plain")
         if is_pdf and not extract_pdf:
             # PDF extraction disabled — skip (a warning) rather than download a
             # binary we'd only discard.
@@ -147,6 +372,11 @@ def scrape_url(url, char_limit, extract_pdf=False):
         if not is_pdf and not is_html:
             response.close()
             return {"_filtered": "non_html", "url": url}
+        if is_pdf and _declared_length(response) > PDF_MAX_BYTES:
+            # A PDF cut at the byte cap loses its trailing xref and can't be
+            # parsed — don't spend the download on it.
+            response.close()
+            return {"_filtered": "pdf_too_large", "url": url}
 
         # ``requests`` ``timeout`` bounds per-read/connect, NOT total download — and
         # ``.content`` downloads the WHOLE body before any slice, so the limit is
@@ -158,13 +388,16 @@ def scrape_url(url, char_limit, extract_pdf=False):
         deadline = time.monotonic() + SCRAPE_TIMEOUT_SECONDS
         buf = bytearray()
         try:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=SCRAPE_READ_CHUNK):
                 if chunk:
                     buf.extend(chunk)
                 if len(buf) >= max_bytes or time.monotonic() > deadline:
                     break
         finally:
             response.close()
+        # Trim the last chunk's overshoot in place so parsers get exactly the cap
+        # (one copy into ``bytes`` instead of slice-then-copy).
+        del buf[max_bytes:]
 
         if is_pdf:
             text = _extract_pdf_text(bytes(buf))
@@ -172,19 +405,18 @@ def scrape_url(url, char_limit, extract_pdf=False):
                 return {"_filtered": "pdf_unreadable", "url": url}
             title = url.split('/')[-1] or url
         else:
-            soup = BeautifulSoup(bytes(buf[:SCRAPE_MAX_RESPONSE_BYTES]), 'html.parser')
-            for tag in soup(HTML_STRIP_TAGS):
-                tag.decompose()
-            text = re.sub(r'\s+', ' ', soup.get_text().strip())
-            title = soup.find('title')
-            title = title.get_text().strip()[:SCRAPE_TITLE_MAX_LENGTH] if title else url.split('/')[-1]
+            charset = _CHARSET_RE.search(content_type)
+            title, text = _extract_html(bytes(buf), charset.group(1) if charset else None)
+            title = title.strip()[:SCRAPE_TITLE_MAX_LENGTH] if title else url.split('/')[-1]
 
         if len(text) < SCRAPE_MIN_TEXT_LENGTH:
             return {"_filtered": "too_short", "url": url}
         if len(text) > SCRAPE_MAX_TEXT_LENGTH:
             text = text[:SCRAPE_MAX_TEXT_LENGTH]
 
-        return {'title': title, 'content': text[:char_limit], 'url': url}
+        page = {'title': title, 'content': text[:char_limit], 'url': url}
+        _scrape_cache.put(cache_key, page)
+        return dict(page)
 
     except Exception as e:
         logger.debug("Scrape failed for %s: %s", url, e)
@@ -242,7 +474,7 @@ def _brave_search(query, num_results, query_prefix="", query_suffix=""):
         if _WS_CONFIG["freshness"]:
             brave_params['freshness'] = _WS_CONFIG["freshness"]
 
-        response = requests.get(
+        response = _HTTP.get(
             'https://api.search.brave.com/res/v1/web/search',
             params=brave_params,
             headers=headers,
@@ -250,23 +482,24 @@ def _brave_search(query, num_results, query_prefix="", query_suffix=""):
         )
 
         if response.status_code == 200:
-            data = response.json()
-            results = data.get('web', {}).get('results', [])
+            data = json_loads(response.content)
+            results = (data.get('web') or {}).get('results') or ()
             # Keep the text Brave already returned (description + extra_snippets)
             # alongside the URL — discarding it was the original mistake that
             # forced fragile full-page scraping to re-obtain text already in hand.
             records = []
+            append = records.append
             for r in results:
-                url = r.get('url', '')
-                if not url.startswith('http'):
+                url = r.get('url')
+                if not url or url[:4] != 'http':
                     continue
-                snippet_parts = [r.get('description', '')]
-                snippet_parts.extend(r.get('extra_snippets') or [])
-                records.append({
-                    'url': url,
-                    'title': r.get('title') or url,
-                    'snippet': "\n".join(p for p in snippet_parts if p).strip(),
-                })
+                description = r.get('description')
+                extra = r.get('extra_snippets')
+                if extra:
+                    snippet = "\n".join(p for p in (description, *extra) if p).strip()
+                else:
+                    snippet = (description or "").strip()
+                append({'url': url, 'title': r.get('title') or url, 'snippet': snippet})
 
             logger.info(f"[WEB_SCRAPE] Brave Search found {len(records)} sources")
             return records, None
@@ -294,6 +527,15 @@ def _from_snippets(records, max_sites, content_char_limit):
     ]
 
 
+def _prefetch_skip(url, extract_pdf):
+    """The ``_filtered`` reason for a URL that is settled without a fetch, or
+    ``None``: skip-listed patterns, and ``.pdf`` links while extraction is off."""
+    reason = _skip_reason(url)
+    if reason is None and not extract_pdf and urlsplit(url).path.lower().endswith(".pdf"):
+        reason = "non_html"
+    return reason
+
+
 async def _from_scrape(records, max_sites, content_char_limit, scrape_budget, extract_pdf, snippet_fallback=False):
     """Scrape strategy: fetch full pages for deep evidence, hard-bounded so it can
     never hang. Returns (content_records, scrape_stats).
@@ -304,29 +546,81 @@ async def _from_scrape(records, max_sites, content_char_limit, scrape_budget, ex
     ``scrape_url`` are necessary but were never sufficient: they don't bound the
     20-URL batch or DNS resolution.) Results are walked in Brave's rank order; with
     ``snippet_fallback`` (hybrid) a failed/filtered page falls back to that result's
-    snippet, so the evidence set is never empty."""
-    urls = [r["url"] for r in records]
-
-    def _scrape_all():
-        with ThreadPoolExecutor(max_workers=SCRAPE_MAX_WORKERS) as executor:
-            return list(executor.map(lambda u: scrape_url(u, content_char_limit, extract_pdf), urls))
-
+    snippet, so the evidence set is never empty. At most one page per host is
+    fetched — the best-ranked one that survives the skip filter. Two pages from
+    one site are mostly redundant evidence and cost a second fetch from the same
+    server; the other same-host results are not scraped, but hybrid uses their
+    snippets for any max_sites slots that pages and fallbacks leave free."""
+    results = [None] * len(records)
+
+    # Harvest in completion order, not rank order: a slow top-ranked URL must not
+    # hold up the batch once max_sites pages are already in hand. The worker
+    # futures are wrapped onto the event loop and awaited there — no thread is
+    # parked just to collect them. Once max_sites pages are in (or the budget
+    # runs out) the rest are cancelled: queued scrapes never start, and shutdown
+    # does not wait for the in-flight ones — their results are simply discarded.
+    executor = ThreadPoolExecutor(max_workers=SCRAPE_MAX_WORKERS)
+    futures = {}
+    hosts = set()
+    for i, rec in enumerate(records):
+        u = rec["url"]
+        # Skip-listed URLs are settled here — they never take a worker slot, and
+        # they don't claim their host, so a lower-ranked page of it still can.
+        reason = _prefetch_skip(u, extract_pdf)
+        if reason:
+            results[i] = {"_filtered": reason, "url": u}
+            continue
+        host = urlsplit(u).hostname or u  # case-insensitive, port ignored
+        if host in hosts:
+            results[i] = {"_duplicate_host": True, "url": u}
+            continue
+        hosts.add(host)
+        fut = executor.submit(scrape_url, u, content_char_limit, extract_pdf)
+        futures[asyncio.wrap_future(fut)] = i
+
+    async def _collect():
+        ok_pages = 0
+        pending = set(futures)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                if fut.cancelled():
+                    continue
+                res = results[futures[fut]] = fut.result()
+                if isinstance(res, dict) and "content" in res:
+                    ok_pages += 1
+                    if ok_pages >= max_sites:
+                        return True
+        return False
+
+    stopped_early = False
     try:
-        results = await asyncio.wait_for(
-            asyncio.get_event_loop().run_in_executor(None, _scrape_all),
-            timeout=scrape_budget,
-        )
+        stopped_early = await asyncio.wait_for(_collect(), timeout=scrape_budget)
     except asyncio.TimeoutError:
-        # Batch overran the budget. Threads finish in the background and are
-        # discarded; the request returns now. Hybrid still yields snippets below.
+        # Batch overran the budget. Pages harvested before the deadline are kept;
+        # in-flight threads finish in the background and are discarded, counted as
+        # failures below (hybrid falls back to their snippets). Returns now.
         logger.warning(f"{BRIGHT_RED}[WEB_SCRAPE] scrape budget {scrape_budget}s exceeded — degrading{RESET}")
-        results = [None] * len(records)
+    finally:
+        for fut in futures:
+            fut.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
 
     out = []
     attempts = ok = failed = 0
+    duplicates = []
     for rec, res in zip(records, results):
         if len(out) >= max_sites:
             break
+        if res is None and stopped_early:
+            # Cancelled because max_sites pages were already in hand — not a failure.
+            continue
+        if isinstance(res, dict) and res.get("_duplicate_host"):
+            # Not scraped (its host already has a page in flight), so not an
+            # attempt. Its snippet only fills slots left over below: it must not
+            # crowd out pages from other hosts.
+            duplicates.append(rec)
+            continue
         attempts += 1
         if isinstance(res, dict) and "content" in res:
             out.append({"title": res["title"], "url": res["url"], "content": res["content"]})
@@ -338,6 +632,15 @@ async def _from_scrape(records, max_sites, content_char_limit, scrape_budget, ex
                     "title": rec["title"], "url": rec["url"],
                     "content": rec["snippet"][:content_char_limit],
                 })
+    if snippet_fallback:
+        for rec in duplicates:
+            if len(out) >= max_sites:
+                break
+            if rec["snippet"]:
+                out.append({
+                    "title": rec["title"], "url": rec["url"],
+                    "content": rec["snippet"][:content_char_limit],
+                })
     return out, {"scrape_attempts": attempts, "scrape_ok": ok, "scrape_failed": failed}
 
 
@@ -350,10 +653,17 @@ def _build_combined_text(query, scraped_content, raw_content_limit):
         keywords = [w.strip() for w in _split_keywords(query) if len(w.strip()) >= MIN_KEYWORD_LENGTH]
         fallback_context = f"Query contains terms: {', '.join(keywords[:_WS_CONFIG['fallback_keywords_limit']])}"
         return f"Research about: {query}\n\n{fallback_context}"
-    return f"Research about: {query}\n\n" + "\n\n".join(
-        f"{i}. {item['title']}\n{item['content'][:_EP_CONFIG['per_site_content_limit']]}"
-        for i, item in enumerate(scraped_content, 1)
-    )[:raw_content_limit]
+    # Spend raw_content_limit as we go rather than joining every source and
+    # slicing: sources past the cap are never formatted or copied.
+    parts, budget = [], raw_content_limit
+    for i, item in enumerate(scraped_content, 1):
+        piece = ("\n\n" if i > 1 else "") + f"{i}. {item['title']}\n{item['content'][:_EP_CONFIG['per_site_content_limit']]}"
+        if len(piece) >= budget:
+            parts.append(piece[:budget])
+            break
+        parts.append(piece)
+        budget -= len(piece)
+    return f"Research about: {query}\n\n" + "".join(parts)
 
 
 def _build_research_prompt(query, scraped_content, schema, raw_content_limit):
@@ -499,23 +809,36 @@ async def web_generate_entity_profile(query, ws_cfg, ep_cfg, schema, skip_search
     else:
         scraped_content = []
         search_method = "Brave Search API"
-        brave_queries = 1
-        # The single metered Brave query, hard-bounded so a DNS/connection edge
-        # case can't stall the step before the strategy even runs.
-        try:
-            records, brave_warning = await asyncio.wait_for(
-                asyncio.to_thread(
-                    _brave_search, query, num_results=num_results,
-                    query_prefix=query_prefix, query_suffix=query_suffix,
-                ),
-                timeout=ws_cfg["brave_api_timeout"] + 2,
-            )
-        except Exception as e:
-            records = []
-            logger.warning(f"{BRIGHT_RED}[WEB_SCRAPE] Brave search bounded-timeout: {e}{RESET}")
-            brave_warning = StepWarning(
-                "web_search", "brave_error", f"Brave search bounded-timeout: {e}", WarningKind.TRANSIENT
-            )
+        search_key = (query_prefix, query, query_suffix, num_results)
+        records = _search_cache.get(search_key)
+        if records is not None:
+            # Same query earlier in the session — no metered call.
+            search_method = "Brave Search API (cached)"
+            logger.info(f"[WEB_SCRAPE] Brave results cached for: '{query}'")
+        else:
+            brave_queries = 1
+            if BRAVE_MIN_INTERVAL > 0:
+                wait = _reserve_brave_slot()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            # The single metered Brave query, hard-bounded so a DNS/connection edge
+            # case can't stall the step before the strategy even runs.
+            try:
+                records, brave_warning = await asyncio.wait_for(
+                    asyncio.to_thread(
+                        _brave_search, query, num_results=num_results,
+                        query_prefix=query_prefix, query_suffix=query_suffix,
+                    ),
+                    timeout=ws_cfg["brave_api_timeout"] + 2,
+                )
+            except Exception as e:
+                records = []
+                logger.warning(f"{BRIGHT_RED}[WEB_SCRAPE] Brave search bounded-timeout: {e}{RESET}")
+                brave_warning = StepWarning(
+                    "web_search", "brave_error", f"Brave search bounded-timeout: {e}", WarningKind.TRANSIENT
+                )
+            if brave_warning is None:
+                _search_cache.put(search_key, records)
 
         if records:
             if strategy == "snippets":
@@ -554,19 +877,21 @@ async def web_generate_entity_profile(query, ws_cfg, ep_cfg, schema, skip_search
     else:
         prompt = _build_research_prompt(query, scraped_content, schema, raw_content_limit)
 
-    # Injection check: verify all elements made it into the prompt
-    checks = [f"{len(prompt):,} chars"]
-    checks.append(f"query: {'✓' if query in prompt else '✗ MISSING'}")
-    if profiling_prompt:
-        unresolved = re.findall(r"\{\{(\w+)\}\}", prompt)
-        checks.append(f"format_string: {'✓' if '{{format_string}}' not in prompt else '✗ MISSING'}")
-        checks.append(f"combined_text: {'✓' if '{{combined_text}}' not in prompt else '✗ MISSING'}")
-        if unresolved:
-            checks.append(f"unresolved vars: {unresolved}")
-    else:
-        has_data = "RESEARCH DATA:" in prompt or any(item['title'] in prompt for item in scraped_content[:1])
-        checks.append(f"research_data: {'✓' if has_data else '✗ MISSING'}")
-    logger.debug(f"{YELLOW}[PROMPT] {' | '.join(checks)}{RESET}")
+    # Injection check: verify all elements made it into the prompt. Debug-only —
+    # it rescans the multi-KB prompt several times, so skip it unless logged.
+    if logger.isEnabledFor(logging.DEBUG):
+        checks = [f"{len(prompt):,} chars"]
+        checks.append(f"query: {'✓' if query in prompt else '✗ MISSING'}")
+        if profiling_prompt:
+            unresolved = _PROMPT_VAR_RE.findall(prompt)
+            checks.append(f"format_string: {'✓' if '{{format_string}}' not in prompt else '✗ MISSING'}")
+            checks.append(f"combined_text: {'✓' if '{{combined_text}}' not in prompt else '✗ MISSING'}")
+            if unresolved:
+                checks.append(f"unresolved vars: {unresolved}")
+        else:
+            has_data = "RESEARCH DATA:" in prompt or any(item['title'] in prompt for item in scraped_content[:1])
+            checks.append(f"research_data: {'✓' if has_data else '✗ MISSING'}")
+        logger.debug(f"{YELLOW}[PROMPT] {' | '.join(checks)}{RESET}")
 
     messages = [{"role": "user", "content": prompt}]
     llm_kwargs = {
@@ -620,7 +945,7 @@ async def web_generate_entity_profile(query, ws_cfg, ep_cfg, schema, skip_search
         debug_info["llm_usage"] = dict(_usage)
     # Cost + reliability per match — the axis PromptPotter weighs against accuracy
     # to pick "most efficiently true". brave_queries is the metered cost (==1 on a
-    # live search, 0 when skipped/precomputed) and is the free-tier ceiling.
+    # live search, 0 when skipped/precomputed/cached) and is the free-tier ceiling.
     debug_info["web_cost"] = {
         "strategy": cost_strategy,
         "brave_queries": brave_queries,
@@ -24,25 +24,68 @@ Or with dry-run to see what would be migrated:
 """
 
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # stdlib fallback: same documents, just slower
+    orjson = None
+
+
+_UTC = timezone.utc
+
+# Langfuse trace status -> MLflow span status code / TraceState value
+_SPAN_STATUS = {"SUCCESS": "OK", "ERROR": "ERROR", "TIMEOUT": "ERROR", "RUNNING": "UNSET"}
+_TRACE_STATE = {"SUCCESS": "OK", "ERROR": "ERROR", "TIMEOUT": "ERROR", "RUNNING": "IN_PROGRESS"}
+# Langfuse observation type -> MLflow span type
+_SPAN_TYPE = {"span": "CHAIN", "generation": "LLM", "event": "UNKNOWN"}
+
+
+def _json_loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes (2-space indent when ``indent``)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
 
 def write_yaml(file_path: Path, data: dict):
     """Write proper YAML format (matches MLflow FileStore)."""
     import yaml
-    with open(file_path, "w", encoding="utf-8") as f:
-        yaml.dump(data, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    # libyaml's C emitter when PyYAML was built with it; pure-Python otherwise.
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    with open(file_path, "wb") as f:
+        yaml.dump(data, f, Dumper=dumper, encoding="utf-8",
+                  default_flow_style=False, allow_unicode=True, sort_keys=False)
 
 
-def convert_langfuse_to_mlflow_trace(langfuse_trace: dict[str, Any]) -> dict[str, Any]:
+def convert_langfuse_to_mlflow_trace(langfuse_trace: dict[str, Any],
+                                     request_preview: str | None = None,
+                                     response_preview: str | None = None) -> dict[str, Any]:
     """
     Convert a Langfuse-style trace to MLflow native format.
 
     Langfuse format has observations/scores.
     MLflow format has info/data with spans.
+
+    ``request_preview``/``response_preview`` take the already-serialized
+    input/output JSON when the caller has it; otherwise they are built here.
     """
+    if request_preview is None:
+        request_preview = _json_dumps(langfuse_trace.get("input", {})).decode()
+    if response_preview is None:
+        response_preview = _json_dumps(langfuse_trace.get("output", {})).decode()
     trace_id = langfuse_trace.get("id", "unknown")
 
     # Extract timestamps
@@ -53,12 +96,6 @@ def convert_langfuse_to_mlflow_trace(langfuse_trace: dict[str, Any]) -> dict[str
 
     # Map status
     status = langfuse_trace.get("status", "SUCCESS")
-    status_map = {
-        "SUCCESS": "OK",
-        "ERROR": "ERROR",
-        "TIMEOUT": "ERROR",
-        "RUNNING": "UNSET",
-    }
 
     # Generate root span ID from trace ID (deterministic)
     root_span_id = trace_id[:16] if len(trace_id) >= 16 else trace_id.ljust(16, "0")
@@ -75,7 +112,7 @@ def convert_langfuse_to_mlflow_trace(langfuse_trace: dict[str, Any]) -> dict[str
         "name": langfuse_trace.get("name", "termnorm_pipeline"),
         "start_time_ns": start_time_ns,
         "end_time_ns": end_time_ns,
-        "status": {"status_code": status_map.get(status, "UNSET")},
+        "status": {"status_code": _SPAN_STATUS.get(status, "UNSET")},
         "inputs": langfuse_trace.get("input", {}),
         "outputs": langfuse_trace.get("output", {}),
         "attributes": {
@@ -92,12 +129,6 @@ def convert_langfuse_to_mlflow_trace(langfuse_trace: dict[str, Any]) -> dict[str
     child_spans = []
     observations = langfuse_trace.get("observations", [])
 
-    span_type_map = {
-        "span": "CHAIN",
-        "generation": "LLM",
-        "event": "UNKNOWN",
-    }
-
     for i, obs in enumerate(observations):
         obs_start = obs.get("start_time", start_time)
         obs_end = obs.get("end_time", obs_start)
@@ -117,7 +148,7 @@ def convert_langfuse_to_mlflow_trace(langfuse_trace: dict[str, Any]) -> dict[str
             "outputs": obs.get("output", {}),
             "attributes": obs.get("metadata", {}),
             "events": [],
-            "span_type": span_type_map.get(obs.get("type", "span"), "UNKNOWN"),
+            "span_type": _SPAN_TYPE.get(obs.get("type", "span"), "UNKNOWN"),
         }
         child_spans.append(child_span)
 
@@ -129,8 +160,8 @@ def convert_langfuse_to_mlflow_trace(langfuse_trace: dict[str, Any]) -> dict[str
             "request_time": int(start_time * 1000) if start_time else 0,
             "execution_duration": int(langfuse_trace.get("latency_ms", 0)),
             "state": "OK" if status == "SUCCESS" else "ERROR",
-            "request_preview": json.dumps(langfuse_trace.get("input", {})),
-            "response_preview": json.dumps(langfuse_trace.get("output", {})),
+            "request_preview": request_preview,
+            "response_preview": response_preview,
             "trace_metadata": {
                 "run_id": langfuse_trace.get("metadata", {}).get("run_id", ""),
                 "session_id": langfuse_trace.get("metadata", {}).get("session_id", ""),
@@ -145,6 +176,24 @@ def convert_langfuse_to_mlflow_trace(langfuse_trace: dict[str, Any]) -> dict[str
     return mlflow_trace
 
 
+def _subdirs(path) -> list[os.DirEntry]:
+    """Child directories of ``path`` (one scandir; dirent types, no stat per child)."""
+    with os.scandir(path) as it:
+        return [e for e in it if e.is_dir(follow_symlinks=False)]
+
+
+def _trace_files_in(artifacts_dir: Path) -> list[Path]:
+    """``artifacts/traces/trace-*.json`` files of one run ([] if none)."""
+    try:
+        with os.scandir(artifacts_dir / "traces") as it:
+            return [
+                Path(e.path) for e in it
+                if e.name.startswith("trace-") and e.name.endswith(".json") and e.is_file()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
 def find_trace_files(experiments_path: Path) -> dict[Path, list[Path]]:
     """
     Find all trace files organized by run artifacts directory.
@@ -153,40 +202,50 @@ def find_trace_files(experiments_path: Path) -> dict[Path, list[Path]]:
     """
     results = {}
 
-    for exp_dir in experiments_path.iterdir():
-        if not exp_dir.is_dir() or exp_dir.name.startswith("."):
+    for exp_dir in _subdirs(experiments_path):
+        if exp_dir.name.startswith("."):
             continue
 
         # Check both old structure (with /runs/) and new structure (without)
-        for run_dir in exp_dir.iterdir():
-            if not run_dir.is_dir():
-                continue
-
+        for run_dir in _subdirs(exp_dir.path):
             # Skip special directories
             if run_dir.name in ("runs", "models"):
                 # Check inside /runs/ for old structure
                 if run_dir.name == "runs":
-                    for old_run_dir in run_dir.iterdir():
-                        if old_run_dir.is_dir():
-                            traces_dir = old_run_dir / "artifacts" / "traces"
-                            if traces_dir.exists():
-                                trace_files = list(traces_dir.glob("trace-*.json"))
-                                if trace_files:
-                                    artifacts_dir = old_run_dir / "artifacts"
-                                    results[artifacts_dir] = trace_files
+                    for old_run_dir in _subdirs(run_dir.path):
+                        artifacts_dir = Path(old_run_dir.path) / "artifacts"
+                        trace_files = _trace_files_in(artifacts_dir)
+                        if trace_files:
+                            results[artifacts_dir] = trace_files
                 continue
 
             # New structure: run directories directly under experiment
-            traces_dir = run_dir / "artifacts" / "traces"
-            if traces_dir.exists():
-                trace_files = list(traces_dir.glob("trace-*.json"))
-                if trace_files:
-                    artifacts_dir = run_dir / "artifacts"
-                    results[artifacts_dir] = trace_files
+            artifacts_dir = Path(run_dir.path) / "artifacts"
+            trace_files = _trace_files_in(artifacts_dir)
+            if trace_files:
+                results[artifacts_dir] = trace_files
 
     return results
 
 
+_SMALL_FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def _write_small_files(files: list[tuple[Path, str | bytes]]) -> None:
+    """Write ``(path, text)`` pairs as UTF-8 with raw ``os.open``/``os.write`` —
+    these are mostly sub-KB values, so skipping the buffered text-IO layer
+    (wrapper objects, encoder, flush) is most of the per-file cost. Values
+    already serialized to bytes are written as-is."""
+    for path, text in files:
+        data = memoryview(text if isinstance(text, bytes) else text.encode("utf-8"))
+        fd = os.open(path, _SMALL_FILE_FLAGS, 0o644)
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+
+
 def save_mlflow_filestore_trace(experiments_path: Path, experiment_id: str,
                                   langfuse_trace: dict, dry_run: bool = False) -> bool:
     """
@@ -209,8 +268,12 @@ def save_mlflow_filestore_trace(experiments_path: Path, experiment_id: str,
     if dry_run:
         return True  # Would create
 
-    # Create directory structure
-    mlflow_traces_path.mkdir(parents=True, exist_ok=True)
+    # Create directory structure. The trace dir's mkdir is the atomic claim:
+    # with parallel workers, a duplicate trace id loses here and is skipped.
+    try:
+        mlflow_traces_path.mkdir(parents=True)
+    except FileExistsError:
+        return False
     (mlflow_traces_path / "request_metadata").mkdir(exist_ok=True)
     (mlflow_traces_path / "tags").mkdir(exist_ok=True)
     (mlflow_traces_path / "artifacts").mkdir(exist_ok=True)
@@ -219,16 +282,21 @@ def save_mlflow_filestore_trace(experiments_path: Path, experiment_id: str,
     start_time = langfuse_trace.get("start_time", 0)
     latency_ms = langfuse_trace.get("latency_ms", 0)
 
-    # Convert Unix timestamp to ISO 8601 string (required by MLflow)
-    from datetime import datetime, timezone
-    if start_time:
-        request_time_str = datetime.fromtimestamp(start_time, tz=timezone.utc).isoformat().replace("+00:00", "Z")
-    else:
-        request_time_str = datetime.now(tz=timezone.utc).isoformat().replace("+00:00", "Z")
+    # Convert Unix timestamp to ISO 8601 string (required by MLflow). A UTC
+    # isoformat() always ends in "+00:00" — swap the fixed suffix for "Z".
+    request_dt = datetime.fromtimestamp(start_time, _UTC) if start_time else datetime.now(_UTC)
+    request_time_str = request_dt.isoformat()[:-6] + "Z"
+
+    # Serialized once: the trace_info previews, the mlflow.trace* tag files and
+    # the traces.json info block all reuse these (bytes for the files, str
+    # for the YAML/JSON documents).
+    inputs_bytes = _json_dumps(langfuse_trace.get("input", {}))
+    outputs_bytes = _json_dumps(langfuse_trace.get("output", {}))
+    inputs_json = inputs_bytes.decode()
+    outputs_json = outputs_bytes.decode()
 
     # Map status to MLflow TraceState string values
     status = langfuse_trace.get("status", "SUCCESS")
-    status_map = {"SUCCESS": "OK", "ERROR": "ERROR", "TIMEOUT": "ERROR", "RUNNING": "IN_PROGRESS"}
 
     # Build trace_info.yaml with MLflow-compatible field names
     # See: mlflow/entities/trace_info.py TraceInfo.from_dict()
@@ -243,19 +311,21 @@ def save_mlflow_filestore_trace(experiments_path: Path, experiment_id: str,
         },
         "request_time": request_time_str,  # Must be ISO 8601 string
         "execution_duration_ms": int(latency_ms) if latency_ms else None,
-        "state": status_map.get(status, "OK"),
-        "request_preview": json.dumps(langfuse_trace.get("input", {})),
-        "response_preview": json.dumps(langfuse_trace.get("output", {})),
+        "state": _TRACE_STATE.get(status, "OK"),
+        "request_preview": inputs_json,
+        "response_preview": outputs_json,
     }
     write_yaml(mlflow_traces_path / "trace_info.yaml", trace_info)
 
+    # request_metadata/* and tags/* are one small file per key — collected and
+    # written in one pass below.
+    small_files = []
+
     # Write request_metadata
     metadata = langfuse_trace.get("metadata", {})
     for key, value in metadata.items():
         if value is not None:
-            meta_file = mlflow_traces_path / "request_metadata" / key
-            with open(meta_file, "w", encoding="utf-8") as f:
-                f.write(str(value))
+            small_files.append((mlflow_traces_path / "request_metadata" / key, str(value)))
 
     # Write tags
     # Artifact location uses file:// URI for MLflow FileStore compatibility
@@ -265,30 +335,74 @@ def save_mlflow_filestore_trace(experiments_path: Path, experiment_id: str,
 
     tags = {
         "mlflow.traceName": langfuse_trace.get("name", "termnorm_pipeline"),
-        "mlflow.traceInputs": json.dumps(langfuse_trace.get("input", {})),
-        "mlflow.traceOutputs": json.dumps(langfuse_trace.get("output", {})),
+        "mlflow.traceInputs": inputs_bytes,
+        "mlflow.traceOutputs": outputs_bytes,
         "mlflow.artifactLocation": artifact_uri,  # Required for trace data access
     }
     for score in langfuse_trace.get("scores", []):
         tags[f"score.{score['name']}"] = str(score["value"])
 
     for key, value in tags.items():
-        tag_file = mlflow_traces_path / "tags" / key
-        with open(tag_file, "w", encoding="utf-8") as f:
-            f.write(str(value))
+        small_files.append((
+            mlflow_traces_path / "tags" / key,
+            value if isinstance(value, bytes) else str(value),
+        ))
+
+    _write_small_files(small_files)
 
     # Save spans as artifact
-    spans_data = convert_langfuse_to_mlflow_trace(langfuse_trace)
+    spans_data = convert_langfuse_to_mlflow_trace(
+        langfuse_trace, request_preview=inputs_json, response_preview=outputs_json
+    )
     spans_file = mlflow_traces_path / "artifacts" / "traces.json"
-    with open(spans_file, "w", encoding="utf-8") as f:
-        json.dump(spans_data, f, indent=2)
+    spans_file.write_bytes(_json_dumps(spans_data, indent=True))
 
     return True
 
 
-def migrate_traces(experiments_path: Path, dry_run: bool = False) -> None:
+def _experiment_id_for(artifacts_dir: Path) -> str:
+    """Experiment id of a run's artifacts directory.
+
+    Path is like: experiments/experiment_id/run_id/artifacts
+    or: experiments/experiment_id/runs/run_id/artifacts (old structure)
+    """
+    path_parts = artifacts_dir.parts
+    exp_idx = path_parts.index("experiments") if "experiments" in path_parts else -1
+    if exp_idx >= 0 and exp_idx + 1 < len(path_parts):
+        return path_parts[exp_idx + 1]
+    # Try to find experiment_id from the relative path
+    experiment_id = artifacts_dir.parent.parent.name
+    if experiment_id == "runs":
+        experiment_id = artifacts_dir.parent.parent.parent.name
+    return experiment_id
+
+
+def _convert_one(trace_file: Path, experiments_path: Path, experiment_id: str,
+                 dry_run: bool) -> tuple[str, str]:
+    """Migrate one trace file. Returns ``(outcome, detail)`` where outcome is
+    ``migrated`` / ``skipped`` / ``error``. Runs in a worker process."""
+    try:
+        langfuse_trace = _json_loads(trace_file.read_bytes())
+
+        # Get trace ID
+        trace_id = langfuse_trace.get("id", "").replace("trace-", "")
+        if not trace_id:
+            trace_id = trace_file.stem.replace("trace-", "")
+        langfuse_trace["id"] = trace_id
+
+        if save_mlflow_filestore_trace(experiments_path, experiment_id, langfuse_trace, dry_run):
+            return "migrated", ""
+        return "skipped", ""
+    except Exception as e:
+        return "error", str(e)
+
+
+def migrate_traces(experiments_path: Path, dry_run: bool = False, workers: int | None = None) -> None:
     """
     Migrate all Langfuse-style traces to MLflow FileStore format.
+
+    Trace files are independent, so they are converted in a process pool
+    (``workers`` processes, default one per CPU); reporting stays here.
     """
     trace_locations = find_trace_files(experiments_path)
 
@@ -299,54 +413,43 @@ def migrate_traces(experiments_path: Path, dry_run: bool = False) -> None:
     total_traces = sum(len(files) for files in trace_locations.values())
     print(f"Found {total_traces} trace files across {len(trace_locations)} runs.")
 
-    for artifacts_dir, trace_files in trace_locations.items():
-        # Extract experiment_id from path
-        # Path is like: experiments/experiment_id/run_id/artifacts
-        # or: experiments/experiment_id/runs/run_id/artifacts (old structure)
-        path_parts = artifacts_dir.parts
-        exp_idx = path_parts.index("experiments") if "experiments" in path_parts else -1
-        if exp_idx >= 0 and exp_idx + 1 < len(path_parts):
-            experiment_id = path_parts[exp_idx + 1]
-        else:
-            # Try to find experiment_id from the relative path
-            experiment_id = artifacts_dir.parent.parent.name
-            if experiment_id == "runs":
-                experiment_id = artifacts_dir.parent.parent.parent.name
-
-        print(f"\n{artifacts_dir}:")
-        print(f"  Experiment: {experiment_id}")
-        print(f"  Langfuse trace files: {len(trace_files)}")
-
-        migrated = 0
-        skipped = 0
-        errors = 0
-
-        for trace_file in trace_files:
-            try:
-                with open(trace_file, "r", encoding="utf-8") as f:
-                    langfuse_trace = json.load(f)
-
-                # Get trace ID
-                trace_id = langfuse_trace.get("id", "").replace("trace-", "")
-                if not trace_id:
-                    trace_id = trace_file.stem.replace("trace-", "")
-                langfuse_trace["id"] = trace_id
-
-                result = save_mlflow_filestore_trace(
-                    experiments_path, experiment_id, langfuse_trace, dry_run
-                )
-
-                if result:
-                    if dry_run:
-                        print(f"    [DRY RUN] Would migrate {trace_file.name}")
-                    else:
-                        print(f"    Migrated {trace_file.name}")
-                    migrated += 1
+    jobs = [
+        (artifacts_dir, _experiment_id_for(artifacts_dir), trace_file)
+        for artifacts_dir, trace_files in trace_locations.items()
+        for trace_file in trace_files
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        outcomes = executor.map(
+            _convert_one,
+            [trace_file for _, _, trace_file in jobs],
+            [experiments_path] * len(jobs),
+            [experiment_id for _, experiment_id, _ in jobs],
+            [dry_run] * len(jobs),
+            chunksize=16,
+        )
+
+        current_dir = None
+        migrated = skipped = errors = 0
+        for (artifacts_dir, experiment_id, trace_file), (outcome, detail) in zip(jobs, outcomes):
+            if artifacts_dir != current_dir:
+                if current_dir is not None:
+                    print(f"  Summary: {migrated} migrated, {skipped} skipped, {errors} errors")
+                current_dir = artifacts_dir
+                migrated = skipped = errors = 0
+                print(f"\n{artifacts_dir}:")
+                print(f"  Experiment: {experiment_id}")
+                print(f"  Langfuse trace files: {len(trace_locations[artifacts_dir])}")
+
+            if outcome == "migrated":
+                if dry_run:
+                    print(f"    [DRY RUN] Would migrate {trace_file.name}")
                 else:
-                    skipped += 1
-
-            except Exception as e:
-                print(f"    Error converting {trace_file.name}: {e}")
+                    print(f"    Migrated {trace_file.name}")
+                migrated += 1
+            elif outcome == "skipped":
+                skipped += 1
+            else:
+                print(f"    Error converting {trace_file.name}: {detail}")
                 errors += 1
 
         print(f"  Summary: {migrated} migrated, {skipped} skipped, {errors} errors")
@@ -358,6 +461,7 @@ def main():
     parser = argparse.ArgumentParser(description="Migrate Langfuse traces to MLflow format")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be migrated without writing")
     parser.add_argument("--path", type=str, default="logs/experiments", help="Path to experiments directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
     args = parser.parse_args()
 
     experiments_path = Path(args.path)
@@ -370,7 +474,7 @@ def main():
     print(f"Mode: {'DRY RUN' if args.dry_run else 'LIVE'}")
     print("-" * 60)
 
-    migrate_traces(experiments_path, dry_run=args.dry_run)
+    migrate_traces(experiments_path, dry_run=args.dry_run, workers=args.workers)
 
     print("\n" + "-" * 60)
     print("Migration complete!")
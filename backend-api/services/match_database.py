@@ -4,22 +4,36 @@ Match Database - Persistent index of standardized identifiers and their aliases.
 Manages loading, saving, updating, and rebuilding the match database from
 langfuse trace data.
 """
+import atexit
 import json
 import logging
+import threading
 from pathlib import Path
-from datetime import datetime
 from typing import Any
 
+from utils import langfuse_logger
 from utils.cache_metadata import CacheMetadata
+from utils.utils import json_dumps, utc_now_iso, write_bytes_atomic
 from config.pipeline_config import get_cache_config
 
 logger = logging.getLogger(__name__)
 
 MATCH_DB_PATH = Path(__file__).parent.parent / "logs" / "match_database.json"
+LANGFUSE_PATH = Path(__file__).parent.parent / "logs" / "langfuse"
 
 _db: dict[str, Any] = {}
 _cache_metadata = CacheMetadata()
 
+# Live updates arrive concurrently (batch /matches runs them in worker threads).
+# They mutate under _lock and share one delayed save instead of each rewriting
+# the whole file.
+SAVE_DELAY = 0.05  # seconds
+_lock = threading.RLock()
+_save_timer: threading.Timer | None = None
+# While a rebuild scans traces off to the side, live updates are also recorded
+# here so they can be replayed onto the rebuilt dict before it is swapped in.
+_updates_during_rebuild: list[tuple[dict[str, Any], str]] | None = None
+
 # Shared thresholds
 _cache_config = get_cache_config()
 HIGH_CONFIDENCE_THRESHOLD = _cache_config["high_confidence_threshold"]
@@ -41,26 +55,26 @@ def _is_alias_verified(method, confidence):
     return method in VERIFIED_METHODS or confidence >= HIGH_CONFIDENCE_THRESHOLD
 
 
-def _ensure_db_entry(target, web_sources=None, timestamp=None):
+def _ensure_db_entry(db, target, web_sources=None, timestamp=None):
     """Create a database entry for target if it doesn't exist. Returns the entry."""
-    if target not in _db:
-        _db[target] = {
+    if target not in db:
+        db[target] = {
             "entity_profile": None,
             "aliases": {},
             "web_sources": web_sources or [],
             "last_updated": timestamp,
         }
-    return _db[target]
+    return db[target]
 
 
-def _update_db_entry(record: dict[str, Any]):
+def _update_db_entry(db, record: dict[str, Any]):
     """Internal: Update database entry without saving (for batch rebuild)."""
     target = record.get("target")
     source = record.get("source")
     if not target or not source or target == "No matches found":
         return
 
-    entry = _ensure_db_entry(target, web_sources=record.get("web_sources", []), timestamp=record.get("timestamp"))
+    entry = _ensure_db_entry(db, target, web_sources=record.get("web_sources", []), timestamp=record.get("timestamp"))
 
     existing = entry["aliases"].get(source)
     if not existing or record.get("timestamp", "") > existing.get("timestamp", ""):
@@ -89,8 +103,6 @@ def load():
     - If experiments directory newer than cache -> rebuild
     - Otherwise -> load from cache
     """
-    global _db
-
     experiments_path = Path(__file__).parent.parent / "logs" / "experiments"
 
     needs_rebuild = False
@@ -115,7 +127,10 @@ def load():
 
     try:
         with open(MATCH_DB_PATH, 'r', encoding='utf-8') as f:
-            _db = json.load(f)
+            db = json.load(f)
+        with _lock:
+            _db.clear()
+            _db.update(db)
         logger.debug(f"[MATCH_DB] Loaded {len(_db)} identifiers from cache")
         summary = _cache_metadata.get_summary()
         logger.debug(f"[MATCH_DB] Cache age: {summary['age']}, identifiers: {summary['total_identifiers']}")
@@ -126,54 +141,111 @@ def load():
 
 def save():
     """Persist match database to JSON file."""
-    MATCH_DB_PATH.parent.mkdir(exist_ok=True)
-    with open(MATCH_DB_PATH, 'w', encoding='utf-8') as f:
-        json.dump(_db, f, indent=2, ensure_ascii=False)
+    with _lock:
+        MATCH_DB_PATH.parent.mkdir(exist_ok=True)
+        # Compact bytes in one write; swapped in atomically so an interrupted
+        # save can't force a full rebuild.
+        write_bytes_atomic(MATCH_DB_PATH, json_dumps(_db))
+
+
+def _schedule_save():
+    """Arm the coalescing save timer unless one is already pending."""
+    global _save_timer
+    with _lock:
+        if _save_timer is None:
+            _save_timer = threading.Timer(SAVE_DELAY, flush)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+
+def flush():
+    """Write a pending coalesced save now (no-op if nothing is pending)."""
+    global _save_timer
+    with _lock:
+        if _save_timer is None:
+            return
+        _save_timer.cancel()
+        _save_timer = None
+        save()
 
 
-def update(record: dict[str, Any]):
-    """Live mode: Update database from single log record."""
-    target = record.get("target")
-    source = record.get("source")
-    if not target or not source or target == "No matches found":
-        return
+atexit.register(flush)
 
-    now = datetime.utcnow().isoformat() + "Z"
+
+def _apply_update(db, record: dict[str, Any], now: str) -> bool:
+    """Apply one live record to db. Returns True if its target is new."""
+    target = record["target"]
+    source = record["source"]
+    method = record.get("method")
+    confidence = record.get("confidence", 0)
 
     # Update all existing aliases for this source to point to new target
-    for entity_id, entity in _db.items():
+    for entity_id, entity in db.items():
         if entity_id == target:
             continue
         if source in entity.get("aliases", {}):
             entity["aliases"][source]["current_target"] = target
 
-    is_new = target not in _db
-
-    entry = _ensure_db_entry(target, web_sources=record.get("web_sources", []), timestamp=now)
+    is_new = target not in db
 
-    method = record.get("method")
-    confidence = record.get("confidence", 0)
-    verified = _is_alias_verified(method, confidence)
+    entry = _ensure_db_entry(db, target, web_sources=record.get("web_sources", []), timestamp=now)
 
     entry["aliases"][source] = {
         "timestamp": now,
         "method": method,
         "confidence": confidence,
-        "verified": verified
+        "verified": _is_alias_verified(method, confidence)
     }
 
     if record.get("web_sources"):
         entry["web_sources"] = record.get("web_sources", [])
         entry["last_updated"] = now
 
-    _cache_metadata.add_incremental_update(
-        source="backend_pipeline",
-        records_added=1,
-        identifiers_added=1 if is_new else 0,
-        identifiers_updated=0 if is_new else 1,
-    )
+    return is_new
+
+
+def update(record: dict[str, Any]):
+    """Live mode: Update database from single log record."""
+    target = record.get("target")
+    source = record.get("source")
+    if not target or not source or target == "No matches found":
+        return
+
+    now = utc_now_iso()
 
-    save()
+    with _lock:
+        is_new = _apply_update(_db, record, now)
+        if _updates_during_rebuild is not None:
+            _updates_during_rebuild.append((record, now))
+
+        _cache_metadata.add_incremental_update(
+            source="backend_pipeline",
+            records_added=1,
+            identifiers_added=1 if is_new else 0,
+            identifiers_updated=0 if is_new else 1,
+        )
+
+        _schedule_save()
+
+
+def _swap_in(db: dict[str, Any]):
+    """Replace the live database with a freshly built one and persist it.
+
+    Updates that landed during the rebuild are replayed onto db first. The dict
+    is swapped in place so references handed out by get_db() stay live, and a
+    pending coalesced save is dropped since this save supersedes it.
+    """
+    global _save_timer, _updates_during_rebuild
+    with _lock:
+        for record, now in _updates_during_rebuild or ():
+            _apply_update(db, record, now)
+        _updates_during_rebuild = None
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+        _db.clear()
+        _db.update(db)
+        save()
 
 
 def rebuild():
@@ -182,20 +254,36 @@ def rebuild():
 
     Scans all traces and observations in logs/langfuse/ to build the match database.
     """
-    global _db
-    _db = {}
+    global _updates_during_rebuild
+    # Built off to the side: live updates keep working on _db meanwhile
+    db: dict[str, Any] = {}
+    with _lock:
+        _updates_during_rebuild = []
+
+    try:
+        return _rebuild_into(db)
+    finally:
+        with _lock:
+            # Already cleared by _swap_in unless the scan raised
+            _updates_during_rebuild = None
+
 
-    langfuse_path = Path(__file__).parent.parent / "logs" / "langfuse"
-    traces_path = langfuse_path / "traces"
-    observations_path = langfuse_path / "observations"
+def _rebuild_into(db: dict[str, Any]) -> int:
+    """Scan the langfuse traces into db, then swap it in as the live database."""
+    # Traces logged just before the rebuild may still be queued in the writer
+    langfuse_logger.flush()
+
+    traces_path = LANGFUSE_PATH / "traces"
+    observations_path = LANGFUSE_PATH / "observations"
 
     if not traces_path.exists():
         logger.warning("[MATCH_DB] No langfuse traces directory found")
-        save()
+        _swap_in(db)
         return 0
 
     logger.info("[MATCH_DB] Rebuilding from langfuse structure...")
-    _cache_metadata.mark_rebuild_start("langfuse")
+    with _lock:
+        _cache_metadata.mark_rebuild_start("langfuse")
 
     total_records = 0
 
@@ -231,25 +319,24 @@ def rebuild():
                         elif obs.get("name") == "web_search":
                             normalized_record["web_sources"] = obs.get("output", {}).get("sources", [])
 
-            _update_db_entry(normalized_record)
+            _update_db_entry(db, normalized_record)
             total_records += 1
 
         except (json.JSONDecodeError, IOError) as e:
             logger.warning(f"[MATCH_DB] Error reading {trace_file}: {e}")
             continue
 
-    identifiers_count = len(_db)
-    aliases_count = sum(len(entry["aliases"]) for entry in _db.values())
-
-    save()
-
-    _cache_metadata.mark_rebuild_complete(
-        source_type="langfuse",
-        records_processed=total_records,
-        identifiers_count=identifiers_count,
-        aliases_count=aliases_count,
-        data_sources=[{"type": "langfuse", "traces_loaded": total_records}],
-    )
+    with _lock:
+        _swap_in(db)
+        identifiers_count = len(_db)
+        aliases_count = sum(len(entry["aliases"]) for entry in _db.values())
+        _cache_metadata.mark_rebuild_complete(
+            source_type="langfuse",
+            records_processed=total_records,
+            identifiers_count=identifiers_count,
+            aliases_count=aliases_count,
+            data_sources=[{"type": "langfuse", "traces_loaded": total_records}],
+        )
 
     logger.info(f"[MATCH_DB] Rebuilt from langfuse: {identifiers_count} identifiers, {total_records} records")
     return identifiers_count
@@ -0,0 +1,90 @@
+"""Tests for the match database's metadata snapshot and its incremental events log.
+
+Self-contained: no pytest required. Run directly:
+
+    .venv/Scripts/python.exe tests/test_cache_metadata.py
+
+Every test uses a fresh temp directory, so nothing here touches logs/.
+"""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.cache_metadata as cm  # noqa: E402
+
+
+def _tmp_metadata_path():
+    return Path(tempfile.mkdtemp()) / "match_database_metadata.json"
+
+
+def _add(meta, n):
+    for _ in range(n):
+        meta.add_incremental_update(source="backend_pipeline", records_added=1, identifiers_added=1)
+
+
+# --- event replay ---------------------------------------------------------------
+
+def test_events_since_last_snapshot_are_replayed_after_a_crash():
+    path = _tmp_metadata_path()
+    meta = cm.CacheMetadata(path)
+    _add(meta, 3)                            # no save(): the process dies here
+    with open(meta.events_path, "ab") as f:
+        f.write(b'{"timestamp": "2026-')     # torn final line from the crash
+
+    reopened = cm.CacheMetadata(path)
+    assert not path.exists()
+    assert reopened._pending_events == 3
+    assert reopened.metadata["last_updated"] == meta.metadata["last_updated"]
+    assert list(reopened._incremental) == list(meta._incremental)
+
+    # The first event after the crash must not be glued onto the torn line
+    reopened.add_incremental_update(source="after_crash", records_added=1)
+    again = cm.CacheMetadata(path)
+    assert again._pending_events == 4
+    assert again._incremental[-1]["source"] == "after_crash"
+
+
+def test_snapshot_absorbs_events_and_replay_resumes_from_it():
+    path = _tmp_metadata_path()
+    meta = cm.CacheMetadata(path)
+    _add(meta, cm.SNAPSHOT_EVERY)
+    assert path.exists() and not meta.events_path.exists()
+    _add(meta, 2)
+    assert len(meta.events_path.read_bytes().splitlines()) == 2
+
+    reopened = cm.CacheMetadata(path)
+    assert reopened._pending_events == 2
+    assert len(reopened._incremental) == cm.SNAPSHOT_EVERY + 2
+    assert reopened.metadata["last_updated"] == meta.metadata["last_updated"]
+    # The snapshot on disk only covers the events folded into it
+    assert len(json.loads(path.read_bytes())["incremental_updates"]) == cm.SNAPSHOT_EVERY
+
+
+def test_incremental_history_stays_bounded():
+    meta = cm.CacheMetadata(_tmp_metadata_path())
+    _add(meta, cm.INCREMENTAL_HISTORY + 5)
+    meta.save()
+    reopened = cm.CacheMetadata(meta.metadata_path)
+    assert len(reopened._incremental) == cm.INCREMENTAL_HISTORY
+
+
+def _run_all():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"  PASS  {t.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  FAIL  {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if _run_all() else 0)
@@ -0,0 +1,212 @@
+"""Tests for the langfuse-compatible file logger and its background writer.
+
+Self-contained: no pytest required. Run directly:
+
+    .venv/Scripts/python.exe tests/test_langfuse_logger.py
+
+Every test points the logger at a fresh temp directory and restores the
+module state afterwards, so nothing here touches logs/.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.langfuse_logger as lf  # noqa: E402
+
+RECORD = {
+    "source": "CuSn6", "target": "Tin bronze", "method": "ProfileRank",
+    "confidence": 0.9, "total_time": 1.2, "llm_provider": "groq/test",
+}
+
+
+@contextmanager
+def _logger_at_tmp():
+    """Point the logger at a temp dir with an empty query index. Restores on exit."""
+    lf.flush()
+    saved = (lf.BASE_PATH, lf.EVENTS_FILE, dict(lf._query_index), set(lf._indexed_items),
+             lf._index_loaded, lf._index_dirty)
+    base = Path(tempfile.mkdtemp()) / "langfuse"
+    lf.BASE_PATH, lf.EVENTS_FILE = base, base / "events.jsonl"
+    lf._query_index.clear()
+    lf._indexed_items.clear()
+    lf._index_loaded = False
+    try:
+        yield base
+    finally:
+        lf.flush()
+        lf.BASE_PATH, lf.EVENTS_FILE = saved[0], saved[1]
+        lf._query_index.clear()
+        lf._query_index.update(saved[2])
+        lf._indexed_items.clear()
+        lf._indexed_items.update(saved[3])
+        lf._index_loaded, lf._index_dirty = saved[4], saved[5]
+
+
+# --- background writer: durability of documents -----------------------------
+
+def test_flushed_documents_are_complete_and_leave_no_temp_files():
+    with _logger_at_tmp() as base:
+        trace_id = lf.log_pipeline(dict(RECORD))
+        lf.flush()
+        trace = json.loads((base / "traces" / f"{trace_id}.json").read_bytes())
+        assert trace["output"]["target"] == "Tin bronze"
+        assert not list(base.rglob("*.tmp"))
+
+
+def test_pending_document_is_readable_until_its_newest_version_is_written():
+    entered, release = threading.Event(), threading.Event()
+    orig_write = lf.write_bytes_atomic
+
+    def gated_write(path, data, **kwargs):
+        entered.set()
+        release.wait(5)                     # hold the writer mid-write
+        orig_write(path, data, **kwargs)
+
+    with _logger_at_tmp() as base:
+        base.mkdir(parents=True)
+        path = base / "doc.json"
+        lf.write_bytes_atomic = gated_write
+        try:
+            lf._write_json(path, {"v": 1})
+            assert entered.wait(5)
+            lf._write_json(path, {"v": 2})  # arrives while v1 is being written
+            assert lf._writer.pending_document(path) is not None
+            assert lf._read_json(path) == {"v": 2}
+            release.set()
+            lf.flush()
+        finally:
+            lf.write_bytes_atomic = orig_write
+            release.set()
+        assert lf._writer.pending_document(path) is None
+        assert json.loads(path.read_bytes()) == {"v": 2}
+
+
+def test_flush_returns_after_earlier_appends_and_documents_land_in_order():
+    with _logger_at_tmp() as base:
+        base.mkdir(parents=True)
+        log = base / "events.jsonl"
+        n = lf._BackgroundWriter.MAX_BATCH * 3    # spans several writer drains
+        for i in range(n):
+            lf._writer.put(log, b"%d\n" % i)
+            if i == n // 2:
+                lf._write_json(base / "mid.json", {"at": i})
+        lf.flush()
+        assert log.read_bytes().split() == [b"%d" % i for i in range(n)]
+        assert json.loads((base / "mid.json").read_bytes()) == {"at": n // 2}
+
+
+def test_writer_survives_an_unexpected_error_and_releases_flush():
+    orig_write = lf.write_bytes_atomic
+
+    def broken_write(path, data, **kwargs):
+        raise ValueError("not an OSError")
+
+    with _logger_at_tmp() as base:
+        base.mkdir(parents=True)
+        lf.write_bytes_atomic = broken_write
+        try:
+            lf._write_json(base / "lost.json", {"v": 1})
+            start = time.monotonic()
+            lf.flush()
+            assert time.monotonic() - start < 1   # not the 5s flush timeout
+        finally:
+            lf.write_bytes_atomic = orig_write
+        lf._write_json(base / "kept.json", {"v": 2})
+        lf.flush()
+        assert lf._writer._thread.is_alive()
+        assert json.loads((base / "kept.json").read_bytes()) == {"v": 2}
+
+
+# --- query index under concurrency --------------------------------------------
+
+def test_concurrent_calls_create_one_item_per_query():
+    orig_gen = lf.generate_dated_id
+
+    def slow_gen(*args):
+        time.sleep(0.01)                    # widen the check-then-create window
+        return orig_gen(*args)
+
+    start = threading.Barrier(8)
+
+    def create(_):
+        start.wait()
+        return lf.get_or_create_item("CuSn6")
+
+    with _logger_at_tmp() as base:
+        lf.generate_dated_id = slow_gen
+        try:
+            with ThreadPoolExecutor(8) as ex:
+                ids = set(ex.map(create, range(8)))
+        finally:
+            lf.generate_dated_id = orig_gen
+        lf.flush()
+        assert len(ids) == 1
+        assert len(list((base / "datasets").glob("*/*.json"))) == 1
+
+
+def test_query_index_snapshot_is_reused_and_rebuilt_when_items_change():
+    with _logger_at_tmp() as base:
+        first = lf.get_or_create_item("CuSn6")
+        lf._save_query_index()
+        lf.flush()
+        snapshot = json.loads((base / "query_index.json").read_bytes())
+        assert snapshot == {"item_ids": [first], "index": {"CuSn6": first}}
+
+        # Fresh process: the snapshot matches the item files -> no item reads
+        lf._query_index.clear(); lf._indexed_items.clear(); lf._index_loaded = False
+        reads = []
+        orig_loads = lf.json_loads
+        lf.json_loads = lambda data: reads.append(1) or orig_loads(data)
+        try:
+            assert lf.get_item_by_query("CuSn6")["id"] == first
+        finally:
+            lf.json_loads = orig_loads
+        assert len(reads) == 2              # snapshot + the item itself
+
+        # An item appearing behind the snapshot's back forces a full scan
+        extra = {"id": "item-extra", "input": {"query": "AlMg3"}}
+        (base / "datasets" / lf.DEFAULT_DATASET / "item-extra.json").write_text(json.dumps(extra))
+        lf._query_index.clear(); lf._indexed_items.clear(); lf._index_loaded = False
+        assert lf.get_item_by_query("AlMg3")["id"] == "item-extra"
+        assert lf.get_item_by_query("CuSn6")["id"] == first
+
+
+def test_item_updates_from_concurrent_log_calls_are_not_lost():
+    with _logger_at_tmp() as base:
+        item_id = lf.get_or_create_item("CuSn6")
+        with lf._write_batch():                       # a log call in progress...
+            assert lf.set_ground_truth(item_id, "Tin bronze")
+            # ...while another worker thread links the item to a new trace
+            other = threading.Thread(target=lf._update_item_trace, args=(item_id, "trace-2"))
+            other.start()
+            other.join()
+        lf.flush()
+        item = json.loads((base / "datasets" / lf.DEFAULT_DATASET / f"{item_id}.json").read_bytes())
+        assert item["expected_output"] == {"target": "Tin bronze"}
+        assert item["source_trace_id"] == "trace-2"
+
+
+def _run_all():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"  PASS  {t.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  FAIL  {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if _run_all() else 0)
@@ -0,0 +1,108 @@
+"""Tests for llm_call's in-process response cache.
+
+Self-contained: no pytest / pytest-asyncio required. Run directly:
+
+    .venv/Scripts/python.exe tests/test_llm_providers.py
+
+Each ``test_*`` is sync and drives async code via ``asyncio.run``. The provider
+client is replaced by a stub that counts calls, so nothing touches the network.
+"""
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.llm_providers as llm  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Classify CuSn6 as json"}]
+TOOLS = [{"type": "function", "function": {"name": "lookup", "parameters": {"type": "object"}}}]
+
+
+@contextmanager
+def _stub_provider():
+    """Swap in a stub OpenAI-compatible client; yields the list of requests it saw."""
+    requests = []
+
+    async def create(**params):
+        requests.append(params)
+        message = SimpleNamespace(content='{"target": "Tin bronze"}')
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=12, completion_tokens=7),
+        )
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    orig_client = llm._provider_client
+    llm._provider_client = lambda provider: client
+    llm._response_cache.clear()
+    try:
+        yield requests
+    finally:
+        llm._provider_client = orig_client
+        llm._response_cache.clear()
+
+
+def _call(**kwargs):
+    return llm.llm_call(list(MESSAGES), provider="groq", model="test-model", output_format="json", **kwargs)
+
+
+# --- response cache ---------------------------------------------------------------
+
+def test_identical_deterministic_call_is_served_from_cache():
+    async def body():
+        first_usage, second_usage = {}, {}
+        first = await _call(temperature=0, usage_out=first_usage)
+        first["target"] = "mutated by caller"
+        second = await _call(temperature=0, usage_out=second_usage)
+        return first_usage, second, second_usage
+
+    with _stub_provider() as requests:
+        first_usage, second, second_usage = asyncio.run(body())
+    assert len(requests) == 1
+    assert second == {"target": "Tin bronze"}      # cached copy unaffected by the caller
+    assert first_usage["input"] == 12
+    assert second_usage["input"] == 0 and second_usage["output"] == 0
+    assert second_usage["finish_reason"] == "stop"
+
+
+def test_sampled_and_tool_calls_are_not_cached():
+    async def body():
+        for kwargs in ({"temperature": 0.7}, {"temperature": 0, "tools": TOOLS}):
+            await _call(**kwargs)
+            await _call(**kwargs)
+
+    with _stub_provider() as requests:
+        asyncio.run(body())
+        assert not llm._response_cache
+    assert len(requests) == 4
+
+
+def test_different_request_misses_the_cache():
+    async def body():
+        await _call(temperature=0)
+        await _call(temperature=0, max_tokens=50)
+
+    with _stub_provider() as requests:
+        asyncio.run(body())
+    assert len(requests) == 2
+
+
+def _run_all():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"  PASS  {t.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  FAIL  {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if _run_all() else 0)
@@ -0,0 +1,140 @@
+"""Tests for the match database's live updates, coalesced saves and rebuild.
+
+Self-contained: no pytest required. Run directly:
+
+    .venv/Scripts/python.exe tests/test_match_database.py
+
+Every test points the database at a fresh temp directory and restores the
+module state afterwards, so nothing here touches logs/.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.match_database as md  # noqa: E402
+from utils.cache_metadata import CacheMetadata  # noqa: E402
+
+LIVE = {"source": "CuSn8", "target": "Tin bronze", "method": "ProfileRank", "confidence": 0.9}
+
+
+@contextmanager
+def _db_at_tmp():
+    """Point the database, its metadata and the trace scan at a temp dir."""
+    md.flush()
+    saved = (md.MATCH_DB_PATH, md.LANGFUSE_PATH, md._cache_metadata, dict(md._db))
+    base = Path(tempfile.mkdtemp())
+    md.MATCH_DB_PATH = base / "match_database.json"
+    md.LANGFUSE_PATH = base / "langfuse"
+    md._cache_metadata = CacheMetadata(base / "match_database_metadata.json")
+    md._db.clear()
+    try:
+        yield base
+    finally:
+        md.flush()
+        md.MATCH_DB_PATH, md.LANGFUSE_PATH, md._cache_metadata = saved[:3]
+        md._db.clear()
+        md._db.update(saved[3])
+
+
+def _write_trace(base, trace_id, query, target):
+    traces = base / "langfuse" / "traces"
+    traces.mkdir(parents=True, exist_ok=True)
+    (traces / f"{trace_id}.json").write_text(json.dumps({
+        "id": trace_id, "timestamp": "2026-01-01T00:00:00Z", "input": {"query": query},
+        "output": {"target": target, "method": "ProfileRank", "confidence": 0.9},
+    }))
+
+
+# --- coalesced saves ---------------------------------------------------------------
+
+def test_concurrent_updates_share_one_save():
+    saves = []
+    orig_save, orig_delay = md.save, md.SAVE_DELAY
+
+    def counting_save():
+        saves.append(1)
+        orig_save()
+
+    def worker(i):
+        for j in range(10):
+            md.update({**LIVE, "source": f"CuSn{i}-{j}"})
+
+    with _db_at_tmp():
+        md.save, md.SAVE_DELAY = counting_save, 10
+        try:
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert not saves                # all 80 updates wait on one pending save
+            md.flush()
+        finally:
+            md.save, md.SAVE_DELAY = orig_save, orig_delay
+        assert len(saves) == 1
+        on_disk = json.loads(md.MATCH_DB_PATH.read_bytes())
+        assert len(on_disk["Tin bronze"]["aliases"]) == 80
+        assert md._save_timer is None
+
+
+# --- rebuild ---------------------------------------------------------------------
+
+def test_update_during_rebuild_survives_the_swap():
+    orig_update_entry = md._update_db_entry
+
+    def update_entry_then_live_update(db, record):
+        orig_update_entry(db, record)
+        # Another worker thread finishes a /matches request mid-scan
+        live = threading.Thread(target=md.update, args=(dict(LIVE),))
+        live.start()
+        live.join()
+
+    with _db_at_tmp() as base:
+        _write_trace(base, "t1", "CuSn6", "Tin bronze")
+        md._update_db_entry = update_entry_then_live_update
+        try:
+            assert md.rebuild() == 1
+        finally:
+            md._update_db_entry = orig_update_entry
+        aliases = md.get_db()["Tin bronze"]["aliases"]
+        assert set(aliases) == {"CuSn6", "CuSn8"}
+        on_disk = json.loads(md.MATCH_DB_PATH.read_bytes())
+        assert set(on_disk["Tin bronze"]["aliases"]) == {"CuSn6", "CuSn8"}
+        assert md._updates_during_rebuild is None
+
+
+def test_rebuild_supersedes_pending_save_and_keeps_db_reference():
+    with _db_at_tmp() as base:
+        db = md.get_db()
+        md.update(dict(LIVE))               # its trace is logged before the update
+        _write_trace(base, "t0", "CuSn8", "Tin bronze")
+        assert md._save_timer is not None
+        _write_trace(base, "t1", "CuSn6", "Tin bronze")
+        md.rebuild()
+        assert md._save_timer is None
+        assert db is md.get_db()
+        assert set(db["Tin bronze"]["aliases"]) == {"CuSn6", "CuSn8"}
+
+
+def _run_all():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"  PASS  {t.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  FAIL  {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if _run_all() else 0)
@@ -0,0 +1,162 @@
+"""Tests for the /matches pipeline: shared per-session state and the batch fan-out.
+
+Self-contained: no pytest / pytest-asyncio required. Run directly:
+
+    .venv/Scripts/python.exe tests/test_research_pipeline.py
+
+Each ``test_*`` is sync and drives async code via ``asyncio.run``. Nothing here
+touches an LLM provider or the network.
+"""
+import asyncio
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api.research_pipeline as rp  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from core.pipeline_context import PipelineContext, StepStatus  # noqa: E402
+
+TERMS = ["tin bronze CuSn6", "spring steel", "aluminium 6061"]
+
+
+def _ctx(query, fut):
+    ctx = PipelineContext(query=query, user_id="u", requested_steps=["token_matching"], params={})
+    ctx.set_output("_token_matcher", fut)
+    return ctx
+
+
+# --- shared session token index ------------------------------------------------
+
+def test_cancelled_request_does_not_cancel_shared_index_build():
+    release = threading.Event()
+    orig_build = rp._build_token_matcher
+
+    def slow_build(terms):
+        release.wait(5)
+        return orig_build(terms)
+
+    async def body():
+        rp.user_sessions["u"] = {"terms": TERMS, "token_matcher": None}
+        fut = rp._session_token_matcher("u")
+        first = asyncio.create_task(rp._step_token("bronze", {}, _ctx("bronze", fut)))
+        second = asyncio.create_task(rp._step_token("tin bronze", {}, _ctx("tin bronze", fut)))
+        await asyncio.sleep(0.05)           # both are now awaiting the build
+        first.cancel()                      # e.g. client disconnect
+        await asyncio.sleep(0)
+        release.set()
+        result = await second
+        try:
+            await first
+        except asyncio.CancelledError:
+            pass
+        return first, fut, result
+
+    rp._build_token_matcher = slow_build
+    try:
+        first, fut, result = asyncio.run(body())
+    finally:
+        rp._build_token_matcher = orig_build
+        rp.user_sessions.pop("u", None)
+    assert first.cancelled()
+    assert not fut.cancelled() and fut.exception() is None
+    assert result.status != StepStatus.FAILED
+    assert result.output and result.output[0][0] == "tin bronze CuSn6"
+
+
+def test_failed_index_build_is_retried_by_next_request():
+    calls = []
+    orig_build = rp._build_token_matcher
+
+    def flaky_build(terms):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return orig_build(terms)
+
+    async def body():
+        rp.user_sessions["u"] = {"terms": TERMS, "token_matcher": None}
+        failed = await rp._step_token("bronze", {}, _ctx("bronze", rp._session_token_matcher("u")))
+        ok = await rp._step_token("bronze", {}, _ctx("bronze", rp._session_token_matcher("u")))
+        return failed, ok
+
+    rp._build_token_matcher = flaky_build
+    try:
+        failed, ok = asyncio.run(body())
+    finally:
+        rp._build_token_matcher = orig_build
+        rp.user_sessions.pop("u", None)
+    assert failed.status == StepStatus.FAILED and failed.output == []
+    assert ok.status != StepStatus.FAILED and ok.output
+    assert len(calls) == 2
+
+
+# --- batch /matches --------------------------------------------------------------
+
+def _batch(payload, match_one):
+    request = SimpleNamespace(state=SimpleNamespace(user_id="u"))
+    orig = rp._match_one
+    rp._match_one = match_one
+    try:
+        return asyncio.run(rp.research_and_match(request, payload))
+    finally:
+        rp._match_one = orig
+
+
+def test_batch_bounds_concurrency_and_reports_failures_per_item():
+    running, peak = [0], [0]
+
+    async def match_one(user_id, payload):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        if payload["query"] == "boom":
+            raise RuntimeError("provider down")
+        if payload["query"] == "no session":
+            raise HTTPException(status_code=400, detail={"code": "no_session"})
+        return rp._ok("done", data={"query": payload["query"]})
+
+    queries = [f"q{i}" for i in range(10)] + ["boom", "no session"]
+    resp = _batch({"queries": queries}, match_one)
+    results = resp["data"]["results"]
+    assert peak[0] == rp.BATCH_MAX_CONCURRENCY
+    assert [r["status"] for r in results] == ["success"] * 10 + ["error", "error"]
+    assert results[0]["data"]["query"] == "q0"
+    assert results[10]["data"] == {"status_code": 500, "detail": "provider down"}
+    assert results[11]["data"] == {"status_code": 400, "detail": {"code": "no_session"}}
+
+
+def test_oversized_batch_is_rejected_before_any_query_runs():
+    calls = []
+
+    async def match_one(user_id, payload):
+        calls.append(payload["query"])
+
+    try:
+        _batch({"queries": ["q"] * (rp.BATCH_MAX_QUERIES + 1)}, match_one)
+    except HTTPException as e:
+        assert e.status_code == 400
+    else:
+        raise AssertionError("oversized batch was accepted")
+    assert not calls
+
+
+def _run_all():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_") and callable(v)]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"  PASS  {t.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  FAIL  {t.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if _run_all() else 0)
@@ -6,13 +6,17 @@ Self-contained: no pytest / pytest-asyncio required. Run directly:
 
 Each ``test_*`` is sync and drives async code via ``asyncio.run`` so the file is
 also pytest-discoverable if pytest is later added. All LLM + network calls are
-stubbed — nothing here touches Brave or a provider. See docs/WEB_SEARCH_STRATEGY.md.
+stubbed — nothing here touches Brave or a provider (the cookie test talks to a
+loopback server only). See docs/WEB_SEARCH_STRATEGY.md.
 """
 import asyncio
+import json
 import os
 import sys
+import threading
 import time
 from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -53,6 +57,10 @@ class FakeResp:
         self._body = body
         self.text = text
 
+    @property
+    def content(self):
+        return json.dumps(self._json).encode() if self._json is not None else self._body
+
     def json(self):
         return self._json
 
@@ -79,7 +87,7 @@ def _brave_results(with_extra_snippets):
 @contextmanager
 def _patched(brave_results, scrape_impl=None):
     """Stub Brave + provider + (optionally) scrape. Restores on exit."""
-    orig_get = web.requests.get
+    orig_get = web._HTTP.get
     orig_llm = web.llm_call
     orig_scrape = web.scrape_url
     orig_use = web.settings.use_brave_api
@@ -96,8 +104,11 @@ def _patched(brave_results, scrape_impl=None):
             kwargs["usage_out"].update({"input": 10, "output": 5})
         return {"core_concept": "spring", "entity_name": "CuSn6"}
 
-    web.requests.get = fake_get
+    web._HTTP.get = fake_get
     web.llm_call = fake_llm
+    web._search_cache.clear()
+    web._scrape_cache.clear()
+    web._brave_next_slot = 0.0
     web.settings.use_brave_api = True
     web.settings.brave_search_api_key = "test-key"
     if scrape_impl is not None:
@@ -105,7 +116,7 @@ def _patched(brave_results, scrape_impl=None):
     try:
         yield
     finally:
-        web.requests.get = orig_get
+        web._HTTP.get = orig_get
         web.llm_call = orig_llm
         web.scrape_url = orig_scrape
         web.settings.use_brave_api = orig_use
@@ -149,7 +160,7 @@ def test_brave_429_surfaces_rate_limited_warning():
     carrying the real body — not the old generic 'No web evidence — no results'."""
     @contextmanager
     def _patched_429():
-        orig_get, orig_llm = web.requests.get, web.llm_call
+        orig_get, orig_llm = web._HTTP.get, web.llm_call
         orig_use, orig_key = web.settings.use_brave_api, web.settings.brave_search_api_key
 
         def fake_get(url, **kw):
@@ -161,12 +172,14 @@ def test_brave_429_surfaces_rate_limited_warning():
                 kwargs["usage_out"].update({"input": 10, "output": 5})
             return {"core_concept": "spring", "entity_name": "CuSn6"}
 
-        web.requests.get, web.llm_call = fake_get, fake_llm
+        web._HTTP.get, web.llm_call = fake_get, fake_llm
         web.settings.use_brave_api, web.settings.brave_search_api_key = True, "test-key"
+        web._search_cache.clear()
+        web._brave_next_slot = 0.0
         try:
             yield
         finally:
-            web.requests.get, web.llm_call = orig_get, orig_llm
+            web._HTTP.get, web.llm_call = orig_get, orig_llm
             web.settings.use_brave_api, web.settings.brave_search_api_key = orig_use, orig_key
 
     with _patched_429():
@@ -199,6 +212,18 @@ def test_snippets_strategy_builds_evidence_without_scraping():
     assert "tin bronze" in debug["scraped_content"][0]["content"]
 
 
+def test_repeat_query_served_from_search_cache():
+    with _patched(_brave_results(False)):
+        first = asyncio.run(web.web_generate_entity_profile(
+            "CuSn6", ws_cfg=_ws_cfg("snippets"), ep_cfg=EP_CFG, schema=SCHEMA))[1]
+        web._HTTP.get = lambda url, **kw: (_ for _ in ()).throw(AssertionError("Brave re-queried"))
+        second = asyncio.run(web.web_generate_entity_profile(
+            "CuSn6", ws_cfg=_ws_cfg("snippets"), ep_cfg=EP_CFG, schema=SCHEMA))[1]
+    assert first["web_cost"]["brave_queries"] == 1
+    assert second["web_cost"]["brave_queries"] == 0          # cached — not metered
+    assert second["scraped_content"] == first["scraped_content"]
+
+
 # --- scrape strategy: hard aggregate deadline = no hang -----------------------
 
 def test_scrape_aggregate_deadline_never_hangs():
@@ -222,6 +247,124 @@ def test_scrape_aggregate_deadline_never_hangs():
     assert len(out) == 2 and out[0]["content"] == "snip-a"    # hybrid snippet fallback
 
 
+def test_scrape_budget_overrun_keeps_completed_pages():
+    def scrape(url, char_limit, extract_pdf=False):
+        if "slow" in url:
+            time.sleep(2.0)
+        return {"title": url, "url": url, "content": "page " + url}
+
+    records = [{"url": "https://slow.example/1", "title": "S", "snippet": "snip-s"},
+               {"url": "https://fast.example/2", "title": "F", "snippet": "snip-f"}]
+    with _patched(_brave_results(False), scrape_impl=scrape):
+        out, stats = asyncio.run(web._from_scrape(
+            records, max_sites=3, content_char_limit=100, scrape_budget=0.5,
+            extract_pdf=False, snippet_fallback=True))
+    assert stats == {"scrape_attempts": 2, "scrape_ok": 1, "scrape_failed": 1}
+    assert [o["content"] for o in out] == ["snip-s", "page https://fast.example/2"]
+
+
+def test_scrape_stops_once_max_sites_pages_collected():
+    def scrape(url, char_limit, extract_pdf=False):
+        if "slow" in url:
+            time.sleep(2.0)
+        return {"title": url, "url": url, "content": "page text"}
+
+    async def body():
+        records = [{"url": "https://slow/1", "title": "S", "snippet": "snip-s"},
+                   {"url": "https://fast/2", "title": "F", "snippet": "snip-f"}]
+        t0 = time.monotonic()
+        out, stats = await web._from_scrape(
+            records, max_sites=1, content_char_limit=100, scrape_budget=5,
+            extract_pdf=False, snippet_fallback=True)
+        return out, stats, time.monotonic() - t0
+
+    with _patched(_brave_results(False), scrape_impl=scrape):
+        out, stats, dt = asyncio.run(body())
+    assert dt < 1.5, f"waited on the slow URL after max_sites was reached ({dt:.2f}s)"
+    assert [o["url"] for o in out] == ["https://fast/2"]
+    assert stats == {"scrape_attempts": 1, "scrape_ok": 1, "scrape_failed": 0}
+
+
+def _recording_scrape(fetched):
+    def scrape(url, char_limit, extract_pdf=False):
+        fetched.append(url)
+        return {"title": url, "url": url, "content": "page " + url}
+    return scrape
+
+
+def test_scrape_fetches_one_page_per_host():
+    recs = [
+        {"url": "https://en.wikipedia.org/wiki/A", "title": "A", "snippet": "a"},
+        {"url": "https://EN.Wikipedia.org/wiki/B#x", "title": "B", "snippet": "b"},
+        {"url": "https://other.example/c", "title": "C", "snippet": "c"},
+    ]
+    fetched = []
+    with _patched(_brave_results(False), scrape_impl=_recording_scrape(fetched)):
+        out, stats = asyncio.run(web._from_scrape(recs, 3, 100, 5, False))
+    assert sorted(fetched) == ["https://en.wikipedia.org/wiki/A", "https://other.example/c"]
+    assert [o["url"] for o in out] == fetched and len(out) == 2
+    assert stats == {"scrape_attempts": 2, "scrape_ok": 2, "scrape_failed": 0}
+
+
+def test_filtered_top_result_does_not_claim_its_host():
+    recs = [
+        {"url": "https://matweb.com/sheet.pdf", "title": "PDF", "snippet": "pdf snip"},
+        {"url": "https://matweb.com/Report.DOCX", "title": "DOCX", "snippet": "docx snip"},
+        {"url": "https://matweb.com/page", "title": "Page", "snippet": "page snip"},
+        {"url": "https://matweb.com/other", "title": "Other", "snippet": "other snip"},
+    ]
+    fetched = []
+    with _patched(_brave_results(False), scrape_impl=_recording_scrape(fetched)):
+        out, stats = asyncio.run(web._from_scrape(recs, 5, 100, 5, False, snippet_fallback=True))
+    # The PDF (extract_pdf off) and the skip-listed DOCX are settled without a
+    # fetch; the host's best remaining page is scraped, the one after it is not.
+    assert fetched == ["https://matweb.com/page"]
+    assert [o["content"] for o in out] == ["pdf snip", "docx snip", "page https://matweb.com/page", "other snip"]
+    assert stats == {"scrape_attempts": 3, "scrape_ok": 1, "scrape_failed": 2}
+
+
+def test_same_host_snippets_do_not_crowd_out_other_hosts():
+    recs = [
+        {"url": f"https://{h}/{i}", "title": f"{h}{i}", "snippet": f"{h}{i}"}
+        for h, i in (("a", 0), ("a", 1), ("a", 2), ("b", 1), ("c", 1))
+    ]
+    fetched = []
+    with _patched(_brave_results(False), scrape_impl=_recording_scrape(fetched)):
+        out, stats = asyncio.run(web._from_scrape(recs, 3, 100, 5, False, snippet_fallback=True))
+        few, _ = asyncio.run(web._from_scrape(recs[:4], 3, 100, 5, False, snippet_fallback=True))
+    assert [o["content"] for o in out] == ["page https://a/0", "page https://b/1", "page https://c/1"]
+    assert stats == {"scrape_attempts": 3, "scrape_ok": 3, "scrape_failed": 0}
+    # With a slot to spare, the best-ranked same-host snippet fills it
+    assert [o["content"] for o in few] == ["page https://a/0", "page https://b/1", "a1"]
+
+
+# --- shared HTTP session -----------------------------------------------------
+
+def test_shared_session_keeps_no_cookies():
+    class SetsCookie(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Set-Cookie", "tracker=1; Path=/")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), SetsCookie)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/"
+        assert web._HTTP.get(url, timeout=5).cookies.get("tracker") == "1"
+        sent = web._HTTP.get(url, timeout=5).request.headers.get("Cookie")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(web._HTTP.cookies) == 0
+    assert sent is None
+
+
 # --- hybrid: failed scrape falls back to that source's snippet ----------------
 
 def test_hybrid_falls_back_to_snippet_on_scrape_failure():
@@ -245,21 +388,126 @@ def test_pdf_extraction_fail_soft():
 
 
 def test_scrape_routes_pdf_when_enabled():
-    orig_get = web.requests.get
+    orig_get = web._HTTP.get
     orig_extract = web._extract_pdf_text
-    web.requests.get = lambda url, **kw: FakeResp(
+    web._HTTP.get = lambda url, **kw: FakeResp(
         headers={"Content-Type": "application/pdf"}, body=b"%PDF-fake-bytes")
     web._extract_pdf_text = lambda data: "extracted datasheet text " * 10
+    web._scrape_cache.clear()
     try:
         ok = web.scrape_url("https://matweb.com/sheet.pdf", 500, extract_pdf=True)
         off = web.scrape_url("https://matweb.com/sheet.pdf", 500, extract_pdf=False)
     finally:
-        web.requests.get = orig_get
+        web._HTTP.get = orig_get
         web._extract_pdf_text = orig_extract
     assert "content" in ok and "extracted datasheet text" in ok["content"]
     assert off.get("_filtered") == "non_html"                 # skipped when disabled
 
 
+def test_scrape_rejects_oversized_pdf_and_non_page_text_types():
+    def fake_get(url, **kw):
+        if url.endswith(".pdf"):
+            return FakeResp(headers={"Content-Type": "application/pdf",
+                                     "Content-Length": str(web.PDF_MAX_BYTES + 1)}, body=b"%PDF")
+        return FakeResp(headers={"Content-Type": "text/css"}, body=b"p { color: red }" * 20)
+
+    orig_get = web._HTTP.get
+    web._HTTP.get = fake_get
+    web._scrape_cache.clear()
+    try:
+        big = web.scrape_url("https://matweb.com/huge.pdf", 500, extract_pdf=True)
+        css = web.scrape_url("https://example.com/site.css", 500)
+    finally:
+        web._HTTP.get = orig_get
+    assert big["_filtered"] == "pdf_too_large"
+    assert css["_filtered"] == "non_html"
+
+
+def test_scrape_parse_only_keeps_listed_tags():
+    html = (b"<html><head><title>Sheet</title><script>var x=1;</script></head><body>"
+            b"<nav>Home About</nav><main><p>" + b"tin bronze density " * 10 +
+            b"</p><table><tr><td>8.8 g/cm3</td></tr></table></main></body></html>")
+    orig_get, orig_strainer = web._HTTP.get, web._PARSE_ONLY
+    web._HTTP.get = lambda url, **kw: FakeResp(headers={"Content-Type": "text/html"}, body=html)
+    web._PARSE_ONLY = web.SoupStrainer(["title", "main"])
+    web._scrape_cache.clear()
+    try:
+        page = web.scrape_url("https://example.com/sheet", 2000)
+    finally:
+        web._HTTP.get, web._PARSE_ONLY = orig_get, orig_strainer
+        web._scrape_cache.clear()
+    assert page["title"] == "Sheet"
+    assert "tin bronze" in page["content"] and "8.8 g/cm3" in page["content"]
+    assert "Home About" not in page["content"] and "var x" not in page["content"]
+
+
+def test_extract_html_backends_agree():
+    html = ("<html><head><title> Bronze Sheet </title><style>p{}</style></head><body>"
+            "<header>Menu</header><p>Zinn\u00adbronze \u00e9</p>tail<p>8.8\n\n g/cm3</p>"
+            "<footer>\u00a9 2024</footer></body></html>").encode("utf-8")
+    orig = web._lxml_html
+    try:
+        fast = web._extract_html(html) if orig is not None else None
+        web._lxml_html = None
+        soup = web._extract_html(html)
+    finally:
+        web._lxml_html = orig
+    assert soup[0].strip() == "Bronze Sheet"
+    assert "Menu" not in soup[1] and "2024" not in soup[1] and "p{}" not in soup[1]
+    assert soup[1].endswith("\u00e9tail8.8 g/cm3")
+    if fast is not None:                                      # lxml installed
+        assert fast == soup
+
+
+# --- URL skip filters ---------------------------------------------------------
+
+def test_scrape_skip_filters_match_case_insensitively():
+    def boom(url, **kw):
+        raise AssertionError("a skipped URL must never be fetched")
+
+    orig_get = web._HTTP.get
+    web._HTTP.get = boom
+    try:
+        ext = web.scrape_url("https://example.com/Report.DOCX", 500)
+        dom = web.scrape_url("https://www.LinkedIn.com/in/someone", 500)
+    finally:
+        web._HTTP.get = orig_get
+    assert ext == {"_filtered": "skip_extension", "url": "https://example.com/Report.DOCX"}
+    assert dom == {"_filtered": "skip_domain", "url": "https://www.LinkedIn.com/in/someone"}
+
+
+def test_canonical_url_drops_fragment_and_tracking_params():
+    assert web._canonical_url("HTTPS://Example.COM/a/b?id=7&utm_source=x&gclid=y#top") == \
+        "https://example.com/a/b?id=7"
+    assert web._canonical_url("https://example.com/a?utm_medium=z") == "https://example.com/a"
+
+
+def test_brave_slots_are_spaced_by_min_interval():
+    web._brave_next_slot = 0.0
+    waits = [web._reserve_brave_slot() for _ in range(3)]
+    web._brave_next_slot = 0.0
+    assert waits[0] == 0.0
+    assert abs(waits[2] - 2 * web.BRAVE_MIN_INTERVAL) < 0.05
+
+
+def test_jitter_only_delays_repeat_hits_on_one_host():
+    web._host_last_hit.clear()
+    assert web._host_jitter_delay("https://a.example/1") == 0.0
+    assert web._host_jitter_delay("https://b.example/1") == 0.0   # distinct host
+    assert 0.0 <= web._host_jitter_delay("https://A.example/2") <= web.SCRAPE_JITTER
+
+
+# --- research context respects raw_content_limit -----------------------------
+
+def test_combined_text_budget_matches_join_then_slice():
+    items = [{"title": f"T{i}", "content": "x" * 40} for i in range(5)]
+    per_site = web._EP_CONFIG['per_site_content_limit']
+    full = "\n\n".join(f"{i}. {it['title']}\n{it['content'][:per_site]}" for i, it in enumerate(items, 1))
+    for limit in (0, 1, 45, 46, 47, 100, len(full), len(full) + 10):
+        got = web._build_combined_text("q", items, limit)
+        assert got == "Research about: q\n\n" + full[:limit], limit
+
+
 # --- skip_search + precomputed branches (unchanged contract) ------------------
 
 def test_skip_search_branch():
@@ -5,8 +5,17 @@ Tracks when cache was last updated and provides staleness detection.
 """
 
 import json
+import time
+from collections import deque
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+
+from utils.utils import json_dumps, utc_now_iso, write_bytes_atomic
+
+# Incremental updates append one JSONL line each; the full snapshot is only
+# rewritten on rebuilds and once this many events have piled up.
+SNAPSHOT_EVERY = 50
+INCREMENTAL_HISTORY = 100
 
 
 class CacheMetadata:
@@ -24,7 +33,19 @@ class CacheMetadata:
             metadata_path = Path(__file__).parent.parent / "logs" / "match_database_metadata.json"
 
         self.metadata_path = metadata_path
+        self.events_path = metadata_path.with_name(metadata_path.stem + "_events.jsonl")
         self.metadata = self._load_metadata()
+        # Bounded history: appends evict the oldest entry in O(1); materialized
+        # back into ``metadata`` only when the snapshot is written.
+        self._incremental = deque(
+            self.metadata.get("incremental_updates", []), maxlen=INCREMENTAL_HISTORY
+        )
+        self._pending_events = self._replay_events()
+        # (last_updated ISO string, its epoch seconds): parsed once per new value
+        self._last_updated_epoch: tuple[str, float] | None = None
+        # Monotonic clock reading of updates made by this process; lets is_stale
+        # skip the wall-clock path entirely once the cache has been touched.
+        self._last_updated_monotonic: float | None = None
 
     def _load_metadata(self) -> dict:
         """Load metadata from disk or create new."""
@@ -50,15 +71,43 @@ class CacheMetadata:
                 },
             }
 
-    def save(self):
-        """Save metadata to disk."""
+    def _replay_events(self) -> int:
+        """Fold events logged since the last snapshot into memory. Returns their count."""
+        if not self.events_path.exists():
+            return 0
+        data = self.events_path.read_bytes()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # Torn final line from an interrupted append: cut it off so the next
+            # append starts on a fresh line instead of being glued onto it.
+            with open(self.events_path, 'r+b') as f:
+                f.truncate(complete)
+        count = 0
+        for line in data[:complete].splitlines():
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # unparseable line; skip it rather than fail startup
+            self._apply_incremental(event)
+            count += 1
+        return count
+
+    def save(self, durable: bool = False):
+        """Save metadata snapshot to disk and drop the events it now covers.
+
+        The snapshot is swapped in atomically; ``durable`` also fsyncs it
+        (used for rebuild completion, skipped on the incremental path).
+        """
         self.metadata_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(self.metadata, f, indent=2, ensure_ascii=False)
+        if self._incremental:
+            self.metadata["incremental_updates"] = list(self._incremental)
+        write_bytes_atomic(self.metadata_path, json_dumps(self.metadata), fsync=durable)
+        self.events_path.unlink(missing_ok=True)
+        self._pending_events = 0
 
     def mark_rebuild_start(self, source_type: str):
         """Mark the start of a cache rebuild operation."""
-        self.metadata["last_rebuild_timestamp"] = datetime.utcnow().isoformat() + "Z"
+        self.metadata["last_rebuild_timestamp"] = utc_now_iso()
         self.metadata["rebuild_in_progress"] = True
         self.metadata["rebuild_source"] = source_type
         self.save()
@@ -72,9 +121,10 @@ class CacheMetadata:
         data_sources: list[dict] = None,
     ):
         """Mark completion of cache rebuild and record statistics."""
-        now = datetime.utcnow().isoformat() + "Z"
+        now = utc_now_iso()
 
         self.metadata["last_updated"] = now
+        self._last_updated_monotonic = time.monotonic()
         self.metadata["rebuild_in_progress"] = False
 
         # Update langfuse source info
@@ -88,7 +138,7 @@ class CacheMetadata:
         self.metadata["statistics"]["total_aliases"] = aliases_count
         self.metadata["statistics"]["total_records_processed"] = records_processed
 
-        self.save()
+        self.save(durable=True)
 
     def add_incremental_update(
         self,
@@ -97,39 +147,51 @@ class CacheMetadata:
         identifiers_added: int = 0,
         identifiers_updated: int = 0,
     ):
-        """Record an incremental update (e.g., after logging a new match)."""
-        now = datetime.utcnow().isoformat() + "Z"
-        self.metadata["last_updated"] = now
+        """Record an incremental update (e.g., after logging a new match).
 
-        # Track incremental updates
-        if "incremental_updates" not in self.metadata:
-            self.metadata["incremental_updates"] = []
-
-        self.metadata["incremental_updates"].append({
-            "timestamp": now,
+        Appends one line to the events log instead of rewriting the snapshot;
+        every SNAPSHOT_EVERY events the snapshot is refreshed.
+        """
+        event = {
+            "timestamp": utc_now_iso(),
             "source": source,
             "records_added": records_added,
             "identifiers_added": identifiers_added,
             "identifiers_updated": identifiers_updated,
-        })
-
-        # Keep only last 100 incremental updates
-        if len(self.metadata["incremental_updates"]) > 100:
-            self.metadata["incremental_updates"] = self.metadata["incremental_updates"][-100:]
-
-        self.save()
+        }
+        self._apply_incremental(event)
+        self._last_updated_monotonic = time.monotonic()
+
+        self._pending_events += 1
+        if self._pending_events >= SNAPSHOT_EVERY:
+            self.save()
+            return
+        self.events_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.events_path, 'ab') as f:
+            f.write(json_dumps(event) + b"\n")
+
+    def _apply_incremental(self, event: dict):
+        """Apply one incremental update event to the in-memory metadata."""
+        self.metadata["last_updated"] = event["timestamp"]
+        self._incremental.append(event)
 
     def get_cache_age_seconds(self) -> float | None:
         """Get age of cache in seconds since last update."""
-        if not self.metadata.get("last_updated"):
+        last_updated = self.metadata.get("last_updated")
+        if not last_updated:
             return None
 
-        last_updated = datetime.fromisoformat(self.metadata["last_updated"].replace("Z", "+00:00"))
-        now = datetime.utcnow().replace(tzinfo=last_updated.tzinfo)
-        return (now - last_updated).total_seconds()
+        if self._last_updated_epoch is None or self._last_updated_epoch[0] != last_updated:
+            parsed = datetime.fromisoformat(last_updated.replace("Z", "+00:00"))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            self._last_updated_epoch = (last_updated, parsed.timestamp())
+        return time.time() - self._last_updated_epoch[1]
 
     def is_stale(self, max_age_seconds: int = 3600) -> bool:
         """Check if cache is stale (older than max_age_seconds)."""
+        if self._last_updated_monotonic is not None:
+            return time.monotonic() - self._last_updated_monotonic > max_age_seconds
         age = self.get_cache_age_seconds()
         if age is None:
             return True
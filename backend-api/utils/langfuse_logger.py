@@ -9,29 +9,275 @@ Directory structure:
     └── datasets/{dataset_name}/{item_id}.json
 """
 
+import atexit
+import functools
 import json
+import logging
+import os
+import queue
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Any
-from datetime import datetime
 
 from .id_gen import generate_dated_id
+from .utils import json_dumps, json_loads, utc_now_iso, write_bytes_atomic
+
+logger = logging.getLogger(__name__)
 
 BASE_PATH = Path("logs/langfuse")
 DEFAULT_DATASET = "termnorm_ground_truth"
 EVENTS_FILE = BASE_PATH / "events.jsonl"
+# Trace/observation/item documents are compact unless LANGFUSE_PRETTY=1
+PRETTY = os.getenv("LANGFUSE_PRETTY") == "1"
 
-# In-memory index for fast query->item_id lookups
+# In-memory index for fast query->item_id lookups, snapshotted to
+# query_index.json together with the item ids it was built from
 _query_index: dict[str, str] = {}
+_indexed_items: set[str] = set()
 _index_loaded = False
+_index_dirty = False
+# Log calls run concurrently in worker threads: the index build, lookups and
+# inserts (check-then-create of items), item read-modify-writes and the
+# snapshot all hold this lock.
+_index_lock = threading.RLock()
+_dirs_ready: Path | None = None  # BASE_PATH the directory tree was created for
+
+# Traces written by this process, so update_trace can skip reading them back
+_RECENT_TRACES_SIZE = 64
+_recent_traces: OrderedDict[str, dict] = OrderedDict()
+# Guards _recent_traces; update_trace holds it from lookup to remember, so
+# concurrent updates of one trace mutate a single shared dict.
+_traces_lock = threading.RLock()
+
+# Per-thread pending JSON documents while a high-level log call is running
+_local = threading.local()
+
+
+class _BackgroundWriter:
+    """Single background thread that owns all langfuse file I/O.
+
+    Two kinds of work are queued: JSONL lines to append (events, scores) and
+    whole JSON documents to (re)write (traces, observations, items). The
+    thread drains up to MAX_BATCH entries per wake-up, appends each JSONL
+    file once per batch, and writes each document once with its latest
+    bytes. Until a document is on disk its bytes stay readable through
+    pending_document(), so in-process reads never see a missing file. The
+    queue is bounded; a full queue blocks the caller rather than dropping
+    records.
+    """
+
+    MAX_BATCH = 256
+    MAX_QUEUED = 10_000
+    MAX_OPEN_FILES = 64  # append handles kept open by the writer thread (LRU)
+    FLUSH_INTERVAL = 0.005  # seconds to let a burst accumulate
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=self.MAX_QUEUED)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._docs: dict[Path, bytes] = {}  # latest unwritten bytes per document
+        self._handles: OrderedDict[Path, Any] = OrderedDict()  # writer thread only
+
+    def put(self, path: Path, line: bytes):
+        """Queue one JSONL line for appending."""
+        if self._thread is None:
+            self._start()
+        self._queue.put((path, line))
+
+    def put_document(self, path: Path, data: bytes):
+        """Queue a full rewrite of ``path``; a newer put supersedes an older one."""
+        if self._thread is None:
+            self._start()
+        with self._lock:
+            self._docs[path] = data
+        self._queue.put((path, None))
+
+    def pending_document(self, path: Path) -> bytes | None:
+        with self._lock:
+            return self._docs.get(path)
+
+    def flush(self, timeout: float = 5.0):
+        """Block until everything queued so far has been written."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put((None, done))
+        done.wait(timeout)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name="langfuse-writer", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            time.sleep(self.FLUSH_INTERVAL)
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                # Keep the thread alive: a dead writer would leave every flush()
+                # waiting out its timeout and, once the queue fills, block put().
+                logger.exception(f"Langfuse writer failed on a batch of {len(batch)} entries")
+                for path, item in batch:
+                    if path is None:
+                        item.set()  # release flush() waiters on this batch
+
+    def _write(self, batch: list):
+        lines: dict[Path, list[bytes]] = {}
+        docs: dict[Path, None] = {}
+        for path, item in batch:
+            if path is None:  # flush marker: everything before it goes out first
+                self._append(lines)
+                self._write_documents(docs)
+                lines, docs = {}, {}
+                item.set()
+            elif item is None:
+                docs[path] = None
+            else:
+                lines.setdefault(path, []).append(item)
+        self._append(lines)
+        self._write_documents(docs)
+
+    def _append(self, pending: dict[Path, list[bytes]]):
+        for path, lines in pending.items():
+            try:
+                f = self._handle(path)
+                f.writelines(lines)
+                f.flush()  # visible to readers once per drain
+            except OSError as e:
+                logger.warning(f"Failed to append {len(lines)} log lines to {path}: {e}")
+                self._close(path)
+
+    def _handle(self, path: Path):
+        """Open (or reuse) a buffered append handle, evicting the least recently used."""
+        f = self._handles.get(path)
+        if f is not None:
+            self._handles.move_to_end(path)
+            return f
+        f = open(path, "ab", buffering=65536)
+        self._handles[path] = f
+        if len(self._handles) > self.MAX_OPEN_FILES:
+            self._close(next(iter(self._handles)))
+        return f
+
+    def _close(self, path: Path):
+        f = self._handles.pop(path, None)
+        if f is not None:
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    def _write_documents(self, paths):
+        for path in paths:
+            data = self.pending_document(path)
+            if data is None:
+                continue  # already written by an earlier queue entry
+            try:
+                # Atomic swap: readers outside this process never see a torn file
+                write_bytes_atomic(path, data)
+            except OSError as e:
+                logger.warning(f"Failed to write {path}: {e}")
+            with self._lock:
+                # Keep it pending if a newer version arrived while writing
+                if self._docs.get(path) is data:
+                    del self._docs[path]
+
+
+_writer = _BackgroundWriter()
+atexit.register(_writer.flush)
+
+
+def flush():
+    """Wait for queued langfuse writes to reach disk."""
+    _writer.flush()
 
 
 def _log_event(event: dict):
     """Append event to events.jsonl (simple flat log of all actions)."""
     _ensure_dirs()
-    event["timestamp"] = datetime.utcnow().isoformat() + "Z"
-    with open(EVENTS_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(event) + "\n")
+    event["timestamp"] = _now()
+    _writer.put(EVENTS_FILE, json_dumps(event) + b"\n")
+
+
+def _write_json(path: Path, obj: dict):
+    """Queue one JSON document for the background writer.
+
+    Inside a write batch the document is only recorded; a later write to the
+    same path replaces it, and the batch writes each path once on exit.
+    """
+    batch = getattr(_local, "batch", None)
+    if batch is not None:
+        batch[path] = obj
+        return
+    _writer.put_document(path, json_dumps(obj, indent=PRETTY))
+
+
+def _read_json(path: Path) -> dict | None:
+    """Read a JSON document, seeing writes still pending in this thread's batch
+    or in the background writer."""
+    batch = getattr(_local, "batch", None)
+    if batch is not None and path in batch:
+        return batch[path]
+    data = _writer.pending_document(path)
+    if data is not None:
+        return json_loads(data)
+    if not path.exists():
+        return None
+    return json_loads(path.read_bytes())
+
+
+@contextmanager
+def _write_batch():
+    """Defer JSON document writes in this thread until the block exits.
+
+    The block also shares one timestamp (see _now) across everything it logs.
+    """
+    if getattr(_local, "batch", None) is not None:
+        yield  # nested: the outermost batch writes
+        return
+    _local.batch = {}
+    _local.now = utc_now_iso()
+    try:
+        yield
+    finally:
+        batch, _local.batch, _local.now = _local.batch, None, None
+        for path, obj in batch.items():
+            _writer.put_document(path, json_dumps(obj, indent=PRETTY))
+
+
+def _now() -> str:
+    """Timestamp for a log record: the write batch's, else the current time."""
+    return getattr(_local, "now", None) or utc_now_iso()
+
+
+def _batched(fn):
+    """Run a high-level log call inside a write batch."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _write_batch():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def _write_item(path: Path, item: dict):
+    """Publish a dataset item to the background writer now, bypassing any write
+    batch. Items are shared across log calls, so every read-modify-write
+    (under _index_lock) must see the previous one instead of a copy still
+    parked in another thread's batch."""
+    _writer.put_document(path, json_dumps(item, indent=PRETTY))
 
 
 def _generate_batch_id() -> str:
@@ -40,11 +286,15 @@ def _generate_batch_id() -> str:
 
 
 def _ensure_dirs():
-    """Create directory structure if needed."""
+    """Create directory structure if needed (once per BASE_PATH)."""
+    global _dirs_ready
+    if _dirs_ready == BASE_PATH:
+        return
     (BASE_PATH / "traces").mkdir(parents=True, exist_ok=True)
     (BASE_PATH / "observations").mkdir(parents=True, exist_ok=True)
     (BASE_PATH / "scores").mkdir(parents=True, exist_ok=True)
     (BASE_PATH / "datasets" / DEFAULT_DATASET).mkdir(parents=True, exist_ok=True)
+    _dirs_ready = BASE_PATH
 
 
 # =============================================================================
@@ -66,7 +316,7 @@ def create_trace(
     trace = {
         "id": trace_id,
         "name": name,
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": _now(),
         "input": input,
         "output": None,
         "user_id": user_id,
@@ -76,31 +326,39 @@ def create_trace(
     }
 
     path = BASE_PATH / "traces" / f"{trace_id}.json"
-    path.write_text(json.dumps(trace, indent=2), encoding="utf-8")
+    _write_json(path, trace)
+    _remember_trace(trace)
     return trace_id
 
 
+def _remember_trace(trace: dict):
+    """Keep a just-written trace in memory (bounded, most recent last)."""
+    with _traces_lock:
+        _recent_traces[trace["id"]] = trace
+        _recent_traces.move_to_end(trace["id"])
+        if len(_recent_traces) > _RECENT_TRACES_SIZE:
+            _recent_traces.popitem(last=False)
+
+
 def update_trace(trace_id: str, output: dict = None, metadata: dict = None):
     """Update trace with output and/or metadata."""
     path = BASE_PATH / "traces" / f"{trace_id}.json"
-    if not path.exists():
-        return
-
-    trace = json.loads(path.read_text(encoding="utf-8"))
-    if output is not None:
-        trace["output"] = output
-    if metadata:
-        trace["metadata"] = {**trace.get("metadata", {}), **metadata}
+    with _traces_lock:
+        trace = _recent_traces.get(trace_id) or _read_json(path)
+        if trace is None:
+            return
+        if output is not None:
+            trace["output"] = output
+        if metadata:
+            trace.setdefault("metadata", {}).update(metadata)
+        _remember_trace(trace)
 
-    path.write_text(json.dumps(trace, indent=2), encoding="utf-8")
+    _write_json(path, trace)
 
 
 def get_trace(trace_id: str) -> dict | None:
     """Get trace by ID."""
-    path = BASE_PATH / "traces" / f"{trace_id}.json"
-    if not path.exists():
-        return None
-    return json.loads(path.read_text(encoding="utf-8"))
+    return _read_json(BASE_PATH / "traces" / f"{trace_id}.json")
 
 
 # =============================================================================
@@ -118,7 +376,7 @@ def create_observation(
 ) -> str:
     """Create observation linked to trace. Returns obs_id."""
     obs_id = f"obs-{uuid.uuid4().hex[:12]}"
-    now = datetime.utcnow().isoformat() + "Z"
+    now = _now()
 
     observation = {
         "id": obs_id,
@@ -137,7 +395,7 @@ def create_observation(
 
     trace_dir = BASE_PATH / "observations" / trace_id
     trace_dir.mkdir(parents=True, exist_ok=True)
-    (trace_dir / f"{obs_id}.json").write_text(json.dumps(observation, indent=2), encoding="utf-8")
+    _write_json(trace_dir / f"{obs_id}.json", observation)
 
     return obs_id
 
@@ -155,12 +413,10 @@ def create_score(trace_id: str, name: str, value: Any, data_type: str = "NUMERIC
         "name": name,
         "value": value,
         "data_type": data_type,
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": _now(),
     }
 
-    path = BASE_PATH / "scores" / f"{trace_id}.jsonl"
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(score) + "\n")
+    _writer.put(BASE_PATH / "scores" / f"{trace_id}.jsonl", json_dumps(score) + b"\n")
 
 
 # =============================================================================
@@ -168,90 +424,130 @@ def create_score(trace_id: str, name: str, value: Any, data_type: str = "NUMERIC
 # =============================================================================
 
 def _load_query_index():
-    """Build query->item_id index from disk (once)."""
+    """Build query->item_id index from disk (once).
+
+    Uses the query_index.json snapshot when it was built from exactly the
+    item files present now (a directory listing, no item reads); otherwise
+    parses every item and writes a fresh snapshot.
+    """
     global _index_loaded
     if _index_loaded:
         return
 
-    datasets_dir = BASE_PATH / "datasets"
-    if datasets_dir.exists():
-        for item_file in datasets_dir.rglob("*.json"):
-            try:
-                item = json.loads(item_file.read_text(encoding="utf-8"))
-                query = item.get("input", {}).get("query")
-                if query:
-                    _query_index[query] = item["id"]
-            except (json.JSONDecodeError, KeyError):
-                continue
-    _index_loaded = True
+    with _index_lock:
+        if _index_loaded:
+            return  # built by another thread while we waited
+        datasets_dir = BASE_PATH / "datasets"
+        if datasets_dir.exists():
+            on_disk = {p.stem for p in datasets_dir.glob("*/*.json")}
+            snapshot = _read_json(BASE_PATH / "query_index.json")
+            if snapshot and set(snapshot.get("item_ids", ())) == on_disk:
+                _query_index.update(snapshot["index"])
+                _indexed_items.update(on_disk)
+            else:
+                for item_file in datasets_dir.rglob("*.json"):
+                    _indexed_items.add(item_file.stem)
+                    try:
+                        item = json_loads(item_file.read_bytes())
+                        query = item.get("input", {}).get("query")
+                        if query:
+                            _query_index[query] = item["id"]
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+                _save_query_index()
+        _index_loaded = True
+
+
+def _save_query_index():
+    """Snapshot the query index (queued on the background writer)."""
+    global _index_dirty
+    with _index_lock:
+        _index_dirty = False
+        snapshot = {"item_ids": sorted(_indexed_items), "index": _query_index}
+        data = json_dumps(snapshot)
+    _writer.put_document(BASE_PATH / "query_index.json", data)
+
+
+def _save_query_index_at_exit():
+    with _index_lock:
+        if _index_dirty:
+            _save_query_index()
+
+
+# Registered after the writer's flush, so it runs first at exit
+atexit.register(_save_query_index_at_exit)
 
 
 def get_or_create_item(query: str, source_trace_id: str = None) -> str:
     """Get existing item for query or create new one. Returns item_id."""
+    global _index_dirty
     _load_query_index()
     _ensure_dirs()
 
-    # Existing item?
-    if query in _query_index:
-        item_id = _query_index[query]
-        if source_trace_id:
-            _update_item_trace(item_id, source_trace_id)
+    with _index_lock:
+        # Existing item?
+        item_id = _query_index.get(query)
+        if item_id is not None:
+            if source_trace_id:
+                _update_item_trace(item_id, source_trace_id)
+            return item_id
+
+        # Create new
+        item_id = f"item-{generate_dated_id(24)}"
+        item = {
+            "id": item_id,
+            "dataset_name": DEFAULT_DATASET,
+            "input": {"query": query},
+            "expected_output": None,
+            "source_trace_id": source_trace_id,
+            "metadata": {"created_at": _now()},
+            "status": "ACTIVE",
+        }
+
+        path = BASE_PATH / "datasets" / DEFAULT_DATASET / f"{item_id}.json"
+        _write_item(path, item)
+        _query_index[query] = item_id
+        _indexed_items.add(item_id)
+        _index_dirty = True
         return item_id
 
-    # Create new
-    item_id = f"item-{generate_dated_id(24)}"
-    item = {
-        "id": item_id,
-        "dataset_name": DEFAULT_DATASET,
-        "input": {"query": query},
-        "expected_output": None,
-        "source_trace_id": source_trace_id,
-        "metadata": {"created_at": datetime.utcnow().isoformat() + "Z"},
-        "status": "ACTIVE",
-    }
-
-    path = BASE_PATH / "datasets" / DEFAULT_DATASET / f"{item_id}.json"
-    path.write_text(json.dumps(item, indent=2), encoding="utf-8")
-    _query_index[query] = item_id
-    return item_id
-
 
 def _update_item_trace(item_id: str, trace_id: str):
     """Update item's source_trace_id."""
     path = BASE_PATH / "datasets" / DEFAULT_DATASET / f"{item_id}.json"
-    if not path.exists():
-        return
+    with _index_lock:
+        item = _read_json(path)
+        if item is None:
+            return
 
-    item = json.loads(path.read_text(encoding="utf-8"))
-    item["source_trace_id"] = trace_id
-    item["metadata"]["updated_at"] = datetime.utcnow().isoformat() + "Z"
-    path.write_text(json.dumps(item, indent=2), encoding="utf-8")
+        item["source_trace_id"] = trace_id
+        item["metadata"]["updated_at"] = _now()
+        _write_item(path, item)
 
 
 def set_ground_truth(item_id: str, target: str) -> bool:
     """Set expected_output for dataset item."""
     path = BASE_PATH / "datasets" / DEFAULT_DATASET / f"{item_id}.json"
-    if not path.exists():
-        return False
-
-    item = json.loads(path.read_text(encoding="utf-8"))
-    item["expected_output"] = {"target": target}
-    item["metadata"]["ground_truth_at"] = datetime.utcnow().isoformat() + "Z"
-    path.write_text(json.dumps(item, indent=2), encoding="utf-8")
+    with _index_lock:
+        item = _read_json(path)
+        if item is None:
+            return False
+
+        item["expected_output"] = {"target": target}
+        item["metadata"]["ground_truth_at"] = _now()
+        _write_item(path, item)
     return True
 
 
 def get_item_by_query(query: str) -> dict | None:
     """Get dataset item by query string."""
     _load_query_index()
-    item_id = _query_index.get(query)
+    with _index_lock:
+        item_id = _query_index.get(query)
     if not item_id:
         return None
 
-    path = BASE_PATH / "datasets" / DEFAULT_DATASET / f"{item_id}.json"
-    if not path.exists():
-        return None
-    return json.loads(path.read_text(encoding="utf-8"))
+    return _read_json(BASE_PATH / "datasets" / DEFAULT_DATASET / f"{item_id}.json")
 
 
 # =============================================================================
@@ -315,6 +611,7 @@ def log_batch_complete(
 # HIGH-LEVEL API
 # =============================================================================
 
+@_batched
 def log_pipeline(
     record: dict[str, Any],
     session_id: str = None,
@@ -456,6 +753,7 @@ def log_pipeline(
     return trace_id
 
 
+@_batched
 def log_cache_match(
     source: str,
     target: str,
@@ -517,6 +815,7 @@ def log_cache_match(
     return trace_id
 
 
+@_batched
 def log_fuzzy_match(
     source: str,
     target: str,
@@ -588,6 +887,7 @@ def log_fuzzy_match(
     return trace_id
 
 
+@_batched
 def log_user_correction(source: str, target: str, method: str = "UserChoice") -> bool:
     """
     Log user correction and update ground truth.
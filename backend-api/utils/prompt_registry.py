@@ -9,6 +9,7 @@ Structure:
             └── prompt.txt (or prompt.yml for GitHub Models format)
 """
 
+import functools
 import json
 import logging
 from pathlib import Path
@@ -28,6 +29,10 @@ class PromptRegistry:
     def __init__(self, base_path: str = "logs/prompts"):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
+        # (family, version) -> ((source file name, mtime_ns), template). Every
+        # profiling/ranking call renders a prompt; a stat() replaces the read +
+        # JSON parse, and an on-disk edit (PromptPotter) still shows up at once.
+        self._templates: dict[tuple[str, str], tuple[tuple[str, int], str]] = {}
 
     def register_prompt(
         self,
@@ -69,6 +74,7 @@ class PromptRegistry:
         with open(prompt_dir / "metadata.json", "w", encoding="utf-8") as f:
             json.dump(meta, f, indent=2)
 
+        self._templates.pop((family, str(version)), None)
         logger.info(f"[PROMPT_REGISTRY] Registered {family} v{version}")
 
     def get_prompt(self, family: str, version: int | None = None) -> str:
@@ -86,27 +92,39 @@ class PromptRegistry:
             version = self.get_latest_version(family)
 
         version_dir = self.base_path / family / str(version)
-        canonical_file = version_dir / "canonical.json"
-        if canonical_file.exists():
-            with open(canonical_file, "r", encoding="utf-8") as f:
-                template = json.load(f)
-            # Match PromptPotter's PromptTemplate.render(): join the 6 canonical
-            # string fields with blank lines, skipping empty ones.
-            six_fields = (
-                "persona",
-                "task_intent",
-                "problem_description",
-                "instruction",
-                "thinking_style",
-                "answer_format",
-            )
-            return "\n\n".join(v for f in six_fields if (v := template.get(f)))
-
-        prompt_file = version_dir / "prompt.txt"
-        if not prompt_file.exists():
-            raise FileNotFoundError(f"Prompt not found: {family} v{version}")
-
-        return prompt_file.read_text(encoding="utf-8")
+        key = (family, str(version))
+        for source in (version_dir / "canonical.json", version_dir / "prompt.txt"):
+            try:
+                stamp = (source.name, source.stat().st_mtime_ns)
+            except FileNotFoundError:
+                continue
+            cached = self._templates.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            template = self._load_template(source)
+            self._templates[key] = (stamp, template)
+            return template
+
+        raise FileNotFoundError(f"Prompt not found: {family} v{version}")
+
+    @staticmethod
+    def _load_template(source: Path) -> str:
+        """Read a template file: canonical.json (rendered) or prompt.txt (verbatim)."""
+        if source.suffix != ".json":
+            return source.read_text(encoding="utf-8")
+        with open(source, "r", encoding="utf-8") as f:
+            template = json.load(f)
+        # Match PromptPotter's PromptTemplate.render(): join the 6 canonical
+        # string fields with blank lines, skipping empty ones.
+        six_fields = (
+            "persona",
+            "task_intent",
+            "problem_description",
+            "instruction",
+            "thinking_style",
+            "answer_format",
+        )
+        return "\n\n".join(v for f in six_fields if (v := template.get(f)))
 
     def get_metadata(self, family: str, version: int | None = None) -> dict:
         """Get prompt metadata."""
@@ -188,16 +206,10 @@ class PromptRegistry:
         return template
 
 
-# Singleton instance
-_registry: PromptRegistry | None = None
-
-
+@functools.lru_cache(maxsize=1)
 def get_prompt_registry() -> PromptRegistry:
     """Get or create singleton prompt registry."""
-    global _registry
-    if _registry is None:
-        _registry = PromptRegistry()
-    return _registry
+    return PromptRegistry()
 
 
 def initialize_default_prompts():
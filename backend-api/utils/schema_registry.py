@@ -9,6 +9,7 @@ Structure:
             └── schema.json
 """
 
+import functools
 import json
 import logging
 from pathlib import Path
@@ -152,16 +153,10 @@ class SchemaRegistry:
         return sorted(versions)
 
 
-# Singleton instance
-_registry: SchemaRegistry | None = None
-
-
+@functools.lru_cache(maxsize=1)
 def get_schema_registry() -> SchemaRegistry:
     """Get or create singleton schema registry."""
-    global _registry
-    if _registry is None:
-        _registry = SchemaRegistry()
-    return _registry
+    return SchemaRegistry()
 
 
 def initialize_default_schemas():
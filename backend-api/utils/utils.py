@@ -4,17 +4,79 @@ Shared ASCII color codes for console output formatting.
 Usage: from utils.utils import CYAN, RED, RESET, etc.
 """
 
+import json
+import os
+from datetime import datetime
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+def utc_now_iso():
+    """Current UTC time as the ISO-8601 ``...Z`` string used across the logs."""
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def json_loads(data):
+    """``json.loads`` through orjson when installed (C parser, takes the response
+    bytes directly), stdlib otherwise. Either way a bad document raises
+    ``json.JSONDecodeError`` (orjson's error subclasses it)."""
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj, indent=False):
+    """Serialize to UTF-8 JSON bytes — orjson when installed (no intermediate
+    str), stdlib otherwise. Compact by default; ``indent=True`` pretty-prints
+    with two spaces."""
+    if _orjson is not None:
+        option = _orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= _orjson.OPT_INDENT_2
+        return _orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=2).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def write_bytes_atomic(path, data, fsync=False):
+    """Replace ``path`` with ``data`` via a sibling temp file and ``os.replace``,
+    so a crash mid-write never leaves a truncated file behind. ``fsync=True``
+    also forces the bytes to disk before the rename."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+_FLATTEN_EXCLUDE = frozenset({'_metadata'})
+
+
 def flatten_strings(data, exclude=None):
     """Recursively extract all strings from nested dict/list, excluding specified keys."""
-    if exclude is None:
-        exclude = {'_metadata'}
-    
+    out = []
+    _collect_strings(data, _FLATTEN_EXCLUDE if exclude is None else exclude, out)
+    return out
+
+
+def _collect_strings(data, exclude, out):
+    # One shared output list: nesting levels append in place instead of each
+    # building a list that its parent then copies.
     if isinstance(data, dict):
-        return [s for k, v in data.items() if k not in exclude for s in flatten_strings(v, exclude)]
+        for k, v in data.items():
+            if k not in exclude:
+                _collect_strings(v, exclude, out)
     elif isinstance(data, list):
-        return [s for item in data for s in flatten_strings(item, exclude)]
+        for item in data:
+            _collect_strings(item, exclude, out)
     else:
-        return [str(data)]
+        out.append(str(data))
 
 
 